@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+from Shortcourse.columns import DictionaryColumn
+"""
+Caches of parsed spreadsheets, so a workbook is only parsed once.
+- WorkbookCache keeps parsed sheets in memory for the rest of the process.
+- Sidecars are directories of .npy files written to disk, which later processes memory map instead of parsing.
+"""
+
+class WorkbookCache():
+    """
+    Least recently used store of parsed sheets, keyed by path, modification time and sheet.
+    Each entry is a dictionary of column name -> read only column array.
+    Editing the file changes its modification time, so the old entry is never served again.
+
+    Properties:
+    - .maxBytes -> memory bound. The least recently used sheets are dropped to stay under it.
+    - .size -> approximate bytes held by the cache.
+    """
+
+    def __init__(self, maxBytes: int = 1 << 30) -> None:
+        self.maxBytes = maxBytes
+        self.size = 0
+        self._entries = OrderedDict()  # key -> (columns, bytes)
+        self._lock = threading.Lock()
+
+    def get(self, path: str, sheet=0):
+        """Returns the cached columns of the sheet, or None if it has not been parsed since it last changed."""
+        key = _key(path, sheet)
+        if key is None:
+            return None
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, path: str, sheet, columns: dict) -> None:
+        """Stores the parsed columns of a sheet. The arrays are made read only because they are shared."""
+        key = _key(path, sheet)
+        if key is None:
+            return
+        for array in columns.values():
+            array.flags.writeable = False
+        size = sum(_arrayBytes(array) for array in columns.values())
+        with self._lock:
+            self._drop(lambda other: other[0] == key[0] and other[2] == key[2])  # Older versions of the sheet
+            if size > self.maxBytes:
+                return
+            self._entries[key] = (columns, size)
+            self.size += size
+            while self.size > self.maxBytes:
+                oldest = next(iter(self._entries))
+                self.size -= self._entries.pop(oldest)[1]
+
+    def invalidate(self, path: str = None) -> None:
+        """Forgets every sheet of the workbook at path, or everything when no path is given."""
+        with self._lock:
+            if path == None:
+                self._entries.clear()
+                self.size = 0
+            else:
+                path = os.path.abspath(path)
+                self._drop(lambda key: key[0] == path)
+
+    def _drop(self, condition) -> None:
+        for key in [key for key in self._entries if condition(key)]:
+            self.size -= self._entries.pop(key)[1]
+
+
+def _key(path: str, sheet) -> tuple:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (os.path.abspath(path), stat.st_mtime_ns, sheet, stat.st_size)
+
+
+def _arrayBytes(array: np.ndarray) -> int:
+    """Approximate memory of a column, including the python objects in object arrays."""
+    if isinstance(array, DictionaryColumn):
+        return array.nbytes
+    if array.dtype.kind == "O":
+        return array.nbytes + sum(sys.getsizeof(cell) for cell in array)
+    return array.nbytes
+
+
+workbookCache = WorkbookCache()
+
+
+def readSidecar(path: str, sheet=0, sidecarDir: str = None):
+    """
+    Returns the columns of the sheet memory mapped from its sidecar, or None if there is no valid sidecar.
+    The sidecar is valid when it was written from a file with the same content hash. The hash is only
+    recomputed when the size or modification time of the file changed since the sidecar was written.
+    """
+    directory = _sidecarPath(path, sheet, sidecarDir)
+    try:
+        with open(os.path.join(directory, "manifest.json"), "r") as file:
+            manifest = json.load(file)
+        stat = os.stat(path)
+        if (manifest["size"], manifest["mtime"]) != (stat.st_size, stat.st_mtime_ns):
+            if manifest["hash"] != _fileHash(path):
+                return None
+            # Same content, only touched. Remember the new stat so the file is not hashed every run.
+            manifest["size"], manifest["mtime"] = stat.st_size, stat.st_mtime_ns
+            with open(os.path.join(directory, "manifest.json"), "w") as file:
+                json.dump(manifest, file)
+        columns = {}
+        for column in manifest["columns"]:
+            data = np.load(os.path.join(directory, column["file"]), mmap_mode="r")
+            if column["values"] != None:  # Dictionary encoded column of python objects
+                with open(os.path.join(directory, column["values"]), "r") as file:
+                    values = _objectArray(json.load(file))
+                data = DictionaryColumn(data, values) if column.get("dictionary", False) else values[data]
+            columns[column["name"]] = data
+        return columns
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def writeSidecar(path: str, sheet, columns: dict, sidecarDir: str = None) -> bool:
+    """
+    Writes the columns of a parsed sheet as a sidecar directory next to the file, or inside sidecarDir.
+    Numeric columns become .npy files. Other columns are stored as integer codes plus a JSON table of their
+    distinct values. Returns False, writing nothing, if a value can not be stored or the directory is not writable.
+    """
+    directory = _sidecarPath(path, sheet, sidecarDir)
+    temporary = f"{directory}.{os.getpid()}.tmp"
+    try:
+        stat = os.stat(path)
+        manifest = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": _fileHash(path), "columns": []}
+        os.makedirs(temporary, exist_ok=True)
+        for index, (name, array) in enumerate(columns.items()):
+            entry = {"name": name, "file": f"{index}.npy", "values": None}
+            if isinstance(array, DictionaryColumn):  # Already encoded. Code -1 is NaN.
+                entry["values"] = f"{index}.json"
+                entry["dictionary"] = True
+                with open(os.path.join(temporary, entry["values"]), "w") as file:
+                    json.dump(array.values.tolist(), file)
+                array = array.codes
+            elif array.dtype.kind == "O":
+                values, codes = _encode(array)
+                entry["values"] = f"{index}.json"
+                with open(os.path.join(temporary, entry["values"]), "w") as file:
+                    json.dump(values, file)
+                array = codes
+            np.save(os.path.join(temporary, entry["file"]), array, allow_pickle=False)
+            manifest["columns"].append(entry)
+        with open(os.path.join(temporary, "manifest.json"), "w") as file:
+            json.dump(manifest, file)
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.rename(temporary, directory)
+        return True
+    except (OSError, TypeError, ValueError):
+        shutil.rmtree(temporary, ignore_errors=True)
+        return False
+
+
+def _sidecarPath(path: str, sheet, sidecarDir: str = None) -> str:
+    folder, name = os.path.split(os.path.abspath(path))
+    if sidecarDir != None:
+        folder = sidecarDir
+    sheet = re.sub(r"[^\w-]", "_", str(sheet))
+    return os.path.join(folder, f"{name}.{sheet}.shortcourse")
+
+
+def _fileHash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _encode(array: np.ndarray) -> tuple:
+    """Distinct JSON values of an object column and the int32 code of every cell. NaN cells share one code."""
+    values = []
+    codes = np.empty(len(array), dtype=np.int32)
+    lookup = {}
+    nan = None
+    for index, cell in enumerate(array):
+        if type(cell) not in [str, int, float, bool] and cell is not None:
+            raise TypeError(f"{type(cell)} can not be stored in a sidecar")
+        if cell != cell:  # NaN is not equal to itself, so it can not be looked up in a dict
+            if nan is None:
+                nan = len(values)
+                values.append(cell)
+            codes[index] = nan
+            continue
+        key = (type(cell), cell)
+        if key not in lookup:
+            lookup[key] = len(values)
+            values.append(cell)
+        codes[index] = lookup[key]
+    return values, codes
+
+
+def _objectArray(values: list) -> np.ndarray:
+    array = np.empty(len(values), dtype=object)
+    for index, value in enumerate(values):
+        array[index] = value
+    return array
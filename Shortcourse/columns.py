@@ -0,0 +1,121 @@
+import sys
+import numpy as np
+from math import nan
+from pandas import factorize
+from pandas.api.types import infer_dtype
+"""
+Compact storage for columns of text.
+"""
+
+class DictionaryColumn():
+    """
+    A column of strings stored as one int32 code per entry into an array of its distinct values.
+    Code -1 marks a missing (NaN) entry, so the codes double as the column's validity mask.
+
+    Indexing with a mask or index array gives another DictionaryColumn sharing the same values, so
+    selections only copy the codes. decode() gives the column as an object array of python values.
+    Comparing to one value is a comparison of integer codes.
+
+    Properties:
+    - .codes -> int32 array with the code of every entry.
+    - .values -> object array of the distinct strings. The code of a string is its index.
+    """
+
+    dtype = np.dtype(object)  # Code that only looks at the dtype treats it as a column of python objects
+    ndim = 1
+
+    def __init__(self, codes: np.ndarray, values: np.ndarray) -> None:
+        self.codes = codes
+        self.values = values
+        self._lookup = None
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, indexer):
+        if np.ndim(indexer) == 0 and not isinstance(indexer, slice):
+            code = self.codes[indexer]
+            return nan if code < 0 else self.values[code]
+        return DictionaryColumn(self.codes[indexer], self.values)
+
+    @property
+    def flags(self):
+        """The flags of the codes, so the column can be made read only like an array."""
+        return self.codes.flags
+
+    @property
+    def nbytes(self) -> int:
+        """Memory of the codes and of the distinct strings."""
+        return self.codes.nbytes + self.values.nbytes + sum(sys.getsizeof(value) for value in self.values)
+
+    def decode(self) -> np.ndarray:
+        """The column as an object array. Missing entries are NaN."""
+        table = np.empty(len(self.values) + 1, dtype=object)
+        table[:-1] = self.values
+        table[-1] = nan
+        return table[self.codes]  # Code -1 picks the NaN at the end
+
+    def tolist(self) -> list:
+        return self.decode().tolist()
+
+    def code(self, value) -> int:
+        """The code of value, or None if it is not in the column."""
+        if self._lookup is None:
+            self._lookup = {value: code for code, value in enumerate(self.values.tolist())}
+        try:
+            return self._lookup.get(value)
+        except TypeError:  # Unhashable values are never in the column
+            return None
+
+    def missing(self) -> np.ndarray:
+        """True where the entry is NaN."""
+        return self.codes < 0
+
+    def equals(self, value) -> np.ndarray:
+        """True where the entry is value, by comparing codes."""
+        code = self.code(value)
+        if code is None:
+            return np.zeros(len(self.codes), dtype=bool)
+        return self.codes == code
+
+    def rank(self) -> np.ndarray:
+        """
+        Dense rank of every entry, like kernels.rank: equal strings share a rank and NaN ranks last.
+        Only the distinct values are sorted.
+        """
+        slots = np.append(np.argsort(self.values, kind="stable"), len(self.values))  # Sorted values, then NaN
+        present = np.zeros(len(self.values) + 1, dtype=bool)
+        present[self.codes] = True  # Code -1 marks the NaN slot
+        slotRanks = np.empty(len(slots), dtype=np.intp)
+        slotRanks[slots] = np.cumsum(present[slots]) - 1
+        return slotRanks[self.codes]
+
+    def concatenate(self, other):
+        """This column followed by other, another DictionaryColumn. New strings are added to the values."""
+        codes = np.empty(len(other.values) + 1, dtype=np.int32)
+        added = []
+        for index, value in enumerate(other.values.tolist()):
+            code = self.code(value)
+            if code is None:
+                code = len(self.values) + len(added)
+                added.append(value)
+            codes[index] = code
+        codes[-1] = -1
+        values = self.values
+        if len(added) > 0:
+            values = np.concatenate([self.values, np.array(added, dtype=object)])
+        return DictionaryColumn(np.concatenate([self.codes, codes[other.codes]]), values)
+
+
+def encodeStrings(array: np.ndarray):
+    """
+    Dictionary encodes an object array whose cells are all strings or NaN.
+    Returns None, leaving the column as it is, if any other value is in it.
+    """
+    if len(array) == 0 or infer_dtype(array, skipna=True) != "string":
+        return None
+    codes, values = factorize(array)
+    missing = codes < 0
+    if missing.any() and not all(isinstance(cell, float) for cell in array[missing]):
+        return None  # Keep None apart from NaN
+    return DictionaryColumn(codes.astype(np.int32), np.asarray(values, dtype=object))
@@ -1,14 +1,20 @@
-from Shortcourse.exceptions import ColumnNameError, EntryIndexOutOfRange, InvalidExcelPath
+from Shortcourse.exceptions import ColumnNameError, EntryIndexOutOfRange, InvalidExcelPath, InvalidFilePath
 from Shortcourse.maths_subdivision import Mixin
+from Shortcourse import kernels
+from Shortcourse.cache import workbookCache, readSidecar, writeSidecar
+from Shortcourse.columns import DictionaryColumn, encodeStrings
+from Shortcourse.groups import GroupBy
+from Shortcourse.query import Query, col, lit
 import copy
-from pandas import read_excel
+import numpy as np
+from pandas import read_csv, read_excel, read_parquet
 """
 This is the core datastructure and related methods & helper functions. 
 """
 
 class Subdivision(Mixin):  
     """ 
-    Contains excel data in a raw matrix format. Features manipulation methods\n\n
+    Contains excel data in a columnar format. Features manipulation methods\n\n
 
     Properties:
     - .columns -> list of columns (vertical matrix) representing the excel data
@@ -16,14 +22,24 @@ class Subdivision(Mixin):
     - .columnNames -> list of names of columns, in order. 
     - .metadata -> dictionary that holds True/False metadata about the table.
     - .columnTypes -> Stores the type found in each column.
+
+    The data is stored once, as one typed array per column. Columns of text are dictionary encoded
+    (see DictionaryColumn) and the type of every column is fixed when it is loaded. The lists returned by .columns
+    and .matrix are derived from the arrays on first access and cached until the table is
+    changed through one of its methods or setters, so they should be treated as read only.
+
+    Arrays are never written in place, so clones, subsets and selections share their parent's
+    arrays (a selection also keeps an index array of its entries). A subdivision only copies
+    the data into arrays of its own when it is changed.
     """
 
     def __init__(self, start_matrix: list, columnNames: list) -> None:
-        self.columns = []  # Setter runs, matrix is declared as empty
-        self.matrix = start_matrix
-        # Matrix re-assigned here. From now on getter recalculates columns directly from matrix.
-        # The column setter can be used for changing matrix by changing columns.
         self.columnNames = columnNames
+        self._data = []  # One typed array per column, possibly shared with other subdivisions.
+        self._rows = None  # Index array of the entries of _data this subdivision shows. None shows all of them.
+        self._cache = {}  # Everything derived from _data. Emptied whenever _data changes.
+        self._running = None  # Running statistics kept up to date by appendEntries. None until the first append.
+        self.matrix = start_matrix  # Setter runs, matrix is split into columns
         self.columnTypes = []
         self.metadata = {
             "clean": False,
@@ -42,27 +58,193 @@ class Subdivision(Mixin):
 
     @property
     def columns(self) -> list:
-        # Consider implementing caching so recalculation is not not needed as frequently
-        return columnsFromMatrix(self.matrix)
+        return [self._list(index) for index in range(len(self._data))]
 
     @columns.setter
     def columns(self, newColumns) -> list:
-        self.matrix = matrixFromColumns(
-            newColumns)  # Matrix first declared here
+        self._data = [_toArray(column) for column in newColumns]
+        self._rows = None
+        self._invalidate()
+
+    @property
+    def matrix(self) -> list:
+        if "matrix" not in self._cache:
+            lists = self.columns
+            self._cache["matrix"] = [list(row) for row in zip(*lists)]
+        return self._cache["matrix"]
+
+    @matrix.setter
+    def matrix(self, newMatrix) -> None:
+        if len(newMatrix) == 0:
+            self.columns = [[] for name in self.columnNames]
+        else:
+            self.columns = columnsFromMatrix(newMatrix)
 
     @property
     def columnTypes(self) -> list:
-        types = []
-        if len(self.columns) == 0:
-            return types
-        for column in self.columns:
-            types.append(type(column[0]))
-        return types
+        if "types" not in self._cache:
+            self._cache["types"] = [self._columnType(index) for index in range(len(self._data))]
+        return self._cache["types"]
 
     @columnTypes.setter
     def columnTypes(self, newTypes) -> list:
         return newTypes
 
+    def _invalidate(self) -> None:
+        """Drops everything derived from the column arrays. Called after every change to the data."""
+        self._cache = {}
+        if self._running is not None:
+            self._running = {}  # Rebuilt from the whole column the next time they are needed
+
+    def _rowCount(self) -> int:
+        if self._rows is not None:
+            return len(self._rows)
+        if len(self._data) == 0:
+            return 0
+        return len(self._data[0])
+
+    def _keep(self, mask: np.ndarray) -> None:
+        """Keeps only the entries (rows) where mask is True, in one pass over each column."""
+        if mask.all():
+            return
+        self._take(mask)
+
+    def _take(self, indexer) -> None:
+        """
+        Keeps the entries (rows) picked by indexer, a boolean mask or an index array, in that order.
+        New arrays are always made, so arrays shared with other subdivisions are left untouched.
+        """
+        if self._rows is not None:
+            indexer = self._rows[indexer]
+            self._rows = None
+        self._data = [array[indexer] for array in self._data]
+        self._invalidate()
+
+    def _materialize(self) -> None:
+        """Turns a selection into arrays of its own."""
+        if self._rows is not None:
+            self._take(np.arange(len(self._rows)))
+
+    def _view(self, rows=None, columnNames: list = None):
+        """
+        Returns a subdivision sharing this one's arrays, with only columnNames and, if given, the entries at rows.
+        """
+        if columnNames == None:
+            columnNames = copy.deepcopy(self.columnNames)
+        view = subdivisionFromColumns([self._data[self._columnIndex(name)] for name in columnNames], columnNames)
+        if rows is None:
+            view._rows = self._rows
+        elif self._rows is None:
+            view._rows = np.asarray(rows, dtype=np.intp)
+        else:
+            view._rows = self._rows[rows]
+        return view
+
+    def _new(self, columns: list, columnNames: list):
+        """Returns a new subdivision made from columns, for methods that return tables."""
+        return subdivisionFromColumns(columns, columnNames)
+
+    def _column(self, index: int) -> np.ndarray:
+        """
+        Returns the array of the column at index. A selection gathers its entries once and caches them,
+        and a dictionary encoded column is decoded once and cached.
+        """
+        data = self._data[index]
+        if self._rows is None and not isinstance(data, DictionaryColumn):
+            return data
+        key = ("column", index)
+        if key not in self._cache:
+            if isinstance(data, DictionaryColumn):
+                self._cache[key] = self._dictionary(index).decode()
+            else:
+                self._cache[key] = data[self._rows]
+        return self._cache[key]
+
+    def _dictionary(self, index: int) -> DictionaryColumn:
+        """The DictionaryColumn of the column at index, at the shown entries. None if it is not encoded."""
+        data = self._data[index]
+        if not isinstance(data, DictionaryColumn) or self._rows is None:
+            return data if isinstance(data, DictionaryColumn) else None
+        key = ("dictionary", index)
+        if key not in self._cache:
+            self._cache[key] = data[self._rows]
+        return self._cache[key]
+
+    def _missing(self, index: int) -> np.ndarray:
+        """True where the entry in the column at index is NaN. Encoded columns only compare codes."""
+        dictionary = self._dictionary(index)
+        if dictionary is not None:
+            return dictionary.missing()
+        return _nanMask(self._column(index))
+
+    def _equals(self, index: int, value) -> np.ndarray:
+        """True where the entry in the column at index is value. Encoded columns only compare codes."""
+        dictionary = self._dictionary(index)
+        if dictionary is not None:
+            return dictionary.equals(value)
+        array = self._column(index)
+        return np.fromiter((cell == value for cell in array), dtype=bool, count=len(array))
+
+    def _sortIndex(self, index: int) -> np.ndarray:
+        """
+        Secondary index of the column at index: the stable argsort of its entries, cached until the data changes.
+        """
+        key = ("order", index)
+        if key not in self._cache:
+            array = self._data[index] if self._dictionary(index) is not None else self._column(index)
+            if array.dtype.kind == "O":
+                self._cache[key] = np.argsort(self._rank(index), kind="stable")
+            else:
+                self._cache[key] = np.argsort(array, kind="stable")
+        return self._cache[key]
+
+    def _rank(self, index: int) -> np.ndarray:
+        """Dense rank of every entry in the column at index. Equal values share a rank and NaN ranks last."""
+        key = ("rank", index)
+        if key not in self._cache:
+            dictionary = self._dictionary(index)
+            if dictionary is not None:
+                self._cache[key] = dictionary.rank()
+                return self._cache[key]
+            array = self._column(index)
+            try:
+                if array.dtype.kind == "O":
+                    self._cache[key] = kernels.rank(array)
+                else:
+                    self._cache[key] = kernels.rank(array, self._sortIndex(index))
+            except TypeError:
+                raise TypeError(f"Values in column {self.columnNames[index]} can not be compared")
+        return self._cache[key]
+
+    def _columnType(self, index: int) -> type:
+        array = self._data[index]
+        if isinstance(array, DictionaryColumn):
+            return str
+        if array.dtype.kind == "O" and self._rows is not None:
+            array = array[self._rows[:1]]  # Only the first shown entry is needed
+        return _arrayType(array)
+
+    def _list(self, index: int) -> list:
+        """Returns the column at index as a cached list of python values."""
+        key = ("list", index)
+        if key not in self._cache:
+            self._cache[key] = self._column(index).tolist()
+        return self._cache[key]
+
+    def _entries(self, indexes: np.ndarray) -> list:
+        """The entries (rows) at indexes, as lists."""
+        return [list(row) for row in zip(*(self._column(index)[indexes].tolist() for index in range(len(self._data))))]
+
+    def _columnIndex(self, columnName: str) -> int:
+        try:
+            return self.columnNames.index(columnName)
+        except ValueError:
+            raise ColumnNameError(columnName, self.columnNames)
+
+    def _array(self, columnName: str) -> np.ndarray:
+        """Returns the typed array backing the column. It is shared, not copied."""
+        return self._column(self._columnIndex(columnName))
+
     def __str__(self) -> str:
         """
         CSV format of subdivision.
@@ -88,11 +270,7 @@ class Subdivision(Mixin):
     def getColumn(self, columnName: str) -> list:
         """Returns the column with the corresponding columnName."""
 
-        try:
-            index = self.columnNames.index(columnName)
-        except ValueError:
-            raise ColumnNameError(columnName, self.columnNames)
-        return self.columns[index]
+        return self._list(self._columnIndex(columnName))
 
     def getEntry(self, index: int) -> list:
         """
@@ -116,65 +294,158 @@ class Subdivision(Mixin):
         except ValueError:
             raise ColumnNameError(oldName, self.columnNames)
         self.columnNames[index] = newName
+        if self.metadata["sorted"]:
+            self.metadata["sorted"] = [(newName if name == oldName else name, reverse) for name, reverse in self.metadata["sorted"]]
+
+    def addColumn(self, columnName: str, column: list) -> None:
+        """Adds a new column to the right of the table."""
+        if columnName in self.columnNames:
+            raise ValueError(f"Column name {columnName} is already used")
+        if len(self._data) > 0 and len(column) != self._rowCount():
+            raise ValueError(f"Column has {len(column)} entries, the table has {self._rowCount()}")
+        self._materialize()
+        self._data = self._data + [_toArray(column)]
+        self.columnNames = self.columnNames + [columnName]  # The old list may be shared with another subdivision
+        self._invalidate()
+
+    def appendEntries(self, entries) -> None:
+        """
+        Adds entries (rows) to the end of the table. entries is a list of rows, or a subdivision with the same columns.
+
+        From the first append on, the statistics of the numerical columns are kept as running totals that are
+        updated with every appended batch, so mean, stdev, pmcc, regression and quartileValue(approximate=True)
+        do not rescan the entries that were already there. Any other change to the table resets them.
+        """
+        if isinstance(entries, Subdivision):
+            new = [_toArray(entries._array(name)) for name in self.columnNames]
+        else:
+            if len(entries) == 0:
+                return
+            for entry in entries:
+                if len(entry) != len(self.columnNames):
+                    raise ValueError(f"Entry {entry} does not have {len(self.columnNames)} values")
+            new = [_toArray(column) for column in columnsFromMatrix(entries)]
+
+        self._materialize()
+        start = self._rowCount()
+        self._data = [_concatenate(old, added) for old, added in zip(self._data, new)]
+        self._cache = {}
+        if any(_nanMask(added).any() for added in new):
+            self.metadata["clean"] = False
+        self.metadata["sorted"] = False
+
+        if self._running is None:
+            self._running = {}
+            return
+        for key, running in list(self._running.items()):
+            arrays = [self._data[index] for index in key[1:]]
+            if any(array.dtype.kind not in "iuf" for array in arrays):
+                del self._running[key]  # The column is no longer numerical
+                continue
+            running.update(*(array[start:] for array in arrays))
 
     def removeEntries(self, indexes: list) -> list:
         """
         Removes entries (rows) from the subdivision and returns the entries.
+        Repeated indexes are only removed once. Entries are returned in table order.
         """
-        entries = []
-        for index in indexes:
-            entries.append(self.matrix[index])
-            self.matrix[index] = False
-
-        while False in self.matrix:
-            self.matrix.remove(False)
-
+        keep = np.ones(self._rowCount(), dtype=bool)
+        keep[np.asarray(indexes, dtype=np.intp)] = False
+        entries = self._entries(np.flatnonzero(~keep))
+        self._keep(keep)
         return entries
 
     def clean(self, columnNames: list) -> list:
-        """Removes all entries (rows) with NaN values in the column and returns their indexes."""
-        removed_indexes = []
+        """Removes all entries (rows) with NaN values in the columns and returns their indexes, once each."""
+        nan = np.zeros(self._rowCount(), dtype=bool)
         for columnName in columnNames:
-            column = self.getColumn(columnName)
-            for index, cell in enumerate(column):
-                if str(cell) == "nan":
-                    removed_indexes.append(index)
+            nan |= self._missing(self._columnIndex(columnName))
 
-        self.removeEntries(removed_indexes)
+        removed_indexes = np.flatnonzero(nan).tolist()
+        self._keep(~nan)
         self.metadata["clean"] = True
         return removed_indexes
 
     def filterByEntry(self, columnName: str, value: str) -> None:
         "Removes all entries (rows) without a certain value in a column."
-        column = self.getColumn(columnName)
-        removed_indexes = []
-        for index, cell in enumerate(column):
-            if cell != value:
-                removed_indexes.append(index)
-        self.removeEntries(removed_indexes)
+        self._keep(self._equals(self._columnIndex(columnName), value))
         self.metadata["filtered"] = True
 
-    def sortEntryValue(self, columnName: str, reverse_srt: bool = False) -> None:
-        """Sorts entries (rows) by ascending order based on value in column."""
-        column = self.getColumn(columnName)
-        if type(column[0]) not in [float, int]:
+    def sortEntryValue(self, columnName, reverse_srt=False) -> None:
+        """
+        Sorts entries (rows) by ascending order based on value in column.
+        columnName can be a list of columns to sort by several keys, the first being the most important.
+        reverse_srt can then be a list too, to sort each key in its own direction.
+        Any column with comparable values can be a key, e.g. numbers and text. NaN goes last.
+        metadata["sorted"] records the keys as a list of (columnName, reverse_srt) pairs.
+        """
+        names = list(columnName) if isinstance(columnName, (list, tuple)) else [columnName]
+        reverses = list(reverse_srt) if isinstance(reverse_srt, (list, tuple)) else [reverse_srt] * len(names)
+        indexes = [self._columnIndex(name) for name in names]
+
+        if len(indexes) == 1 and not reverses[0]:
+            order = self._sortIndex(indexes[0])
+        else:
+            # Stable sort over the dense ranks of every key. Negated ranks sort a key in descending order,
+            # after a NaN flag so NaN still goes last.
+            keys = []
+            for index, reverse in zip(indexes, reverses):
+                keys += [self._missing(index), -self._rank(index)] if reverse else [self._rank(index)]
+            order = np.lexsort(keys[::-1])
+        self._take(order)
+        if not reverses[0]:
+            self._cache[("order", indexes[0])] = np.arange(len(order))  # Already in order of the first key
+        self.metadata["sorted"] = list(zip(names, reverses))
+
+    def rangeIndexes(self, columnName: str, low=None, high=None) -> list:
+        """
+        Returns the indexes of the entries (rows) with low <= value <= high in the column, in table order.
+        Leaving out low or high leaves that side open. Uses the column's cached sort, so only needs a binary search.
+        """
+        if self.getColumnType(columnName) not in [float, int]:
             raise TypeError
+        index = self._columnIndex(columnName)
+        order = self._sortIndex(index)
+        ordered = self._column(index)[order]
+        start = 0 if low is None else np.searchsorted(ordered, low, side="left")
+        end = np.searchsorted(ordered, np.inf if high is None else high, side="right")  # NaN sorts after inf
+        return np.sort(order[start:end]).tolist()
+
+    def selectRange(self, columnName: str, low=None, high=None):
+        """Returns the entries (rows) with low <= value <= high in the column as a subdivision sharing this one's data."""
+        return self._view(rows=self.rangeIndexes(columnName, low, high))
+
+    def groupBy(self, columnName: str):
+        """
+        Partitions the entries (rows) by their value in the column. See GroupBy.
+        e.g. subdivision.groupBy("continent")["Asia"] or subdivision.groupBy("continent").mean("gdp_per_capita")
+        """
+        return GroupBy(self, columnName)
 
-        index_value_pair = list(enumerate(column))
+    def query(self):
+        """
+        Starts a lazy query on the subdivision. See Query.
+        e.g. subdivision.query().where(col("gdp_per_capita") < 1000).select("location").collect()
+        """
+        return Query(self)
 
-        def getValue(pair): return pair[1]
-        def getEntryFromPair(pair): return self.matrix[pair[0]]
+    def clone(self):
+        """"Clones the subdivision. The clone shares the data until either of them is changed."""
+        return self._view()
 
-        index_value_pair.sort(key=getValue, reverse=reverse_srt)
-        self.matrix = [entry for entry in map(
-            getEntryFromPair, index_value_pair)]
-        self.metadata["sorted"] = True
+    def selectEntries(self, indexes: list):
+        """Returns a new subdivision with only the entries (rows) at indexes. The data is shared, not copied."""
+        return self._view(rows=np.asarray(indexes, dtype=np.intp))
 
-    def clone(self):
-        """"Clones the subdivision"""
-        new_matrix = copy.deepcopy(self.matrix)
-        new_columnName = copy.deepcopy(self.columnNames)
-        return Subdivision(new_matrix, new_columnName)
+    def selectByEntry(self, columnName: str, value: str):
+        """
+        Like filterByEntry, but returns the entries with value in the column as a new subdivision
+        sharing this one's data, instead of removing the other entries from this one.
+        """
+        mask = self._equals(self._columnIndex(columnName), value)
+        selection = self._view(rows=np.flatnonzero(mask))
+        selection.metadata["filtered"] = True
+        return selection
     
 
 #helper functions:
@@ -182,9 +453,7 @@ def columnsFromMatrix(matrix) -> list:
     """Turns the list of rows (matrix) into a list of columns."""
     columns = []
     for entry in range(len(matrix[0])):
-        column = []
-        for row in matrix:
-            column.append(row[entry])
+        column = [row[entry] for row in matrix]
         columns.append(column)
     return columns
 
@@ -202,46 +471,154 @@ def matrixFromColumns(columns) -> list:
     return rows  # list of rows is the same as matrix
 
 
+def subdivisionFromColumns(columns: list, columnNames: list) -> Subdivision:
+    """Creates a subdivision straight from a list of columns, without building rows first."""
+    new_subdivision = Subdivision([], columnNames)
+    new_subdivision.columns = columns
+    return new_subdivision
+
+
 def subsetSubdivision(parent: Subdivision, columnNames: list) -> Subdivision:
     """Creates a subset of parent subdivision, including only columnNames."""
     if len(columnNames) < 1:
         raise ValueError
     if len(parent.columnNames) < len(columnNames):
         raise ValueError
-    new_matrix = []
-    for i in range(len(parent.matrix)):
-        row = []
-        for j in columnNames:
-            row.append(parent.getColumn(j)[i])
-        new_matrix.append(row)
-    return Subdivision(new_matrix, columnNames)
+    return parent._view(columnNames=list(columnNames))
+
+def subdivisionFromExcel(path: str, columnNames: list, sheet=0, cache: bool = True, sidecar: bool = False, sidecarDir: str = None) -> Subdivision:
+    """
+    Creates a subdivision from an Excel file path input. Only includes columnNames as in the Excel file.
 
-def subdivisionFromExcel(path: str, columnNames: list) -> Subdivision:
-    """Creates a subdivision from an Excel file path input. Only includes columnNames as in the Excel file."""
+    With cache on, the whole sheet is parsed once and kept in workbookCache, so later calls on the
+    same unchanged file are served from memory whatever columns they ask for.
+    Use workbookCache.invalidate() to free it. With cache off, only columnNames are parsed.
+
+    With sidecar on, the parsed sheet is also written to disk next to the file (or in sidecarDir).
+    Later runs, including other scripts, memory map it instead of parsing the workbook again.
+    """
+    if not cache:
+        wanted = set(columnNames)
+        try:
+            raw = read_excel(path, sheet_name=sheet, usecols=lambda name: name in wanted)
+        except:
+            raise InvalidExcelPath(path=path)
+        return _subdivisionFromFrame(raw, columnNames)
+
+    columns = workbookCache.get(path, sheet)
+    if columns is None and sidecar:
+        columns = readSidecar(path, sheet, sidecarDir)
+        if columns is not None:
+            workbookCache.put(path, sheet, columns)
+    if columns is None:
+        try:
+            raw = read_excel(path, sheet_name=sheet)
+        except:
+            raise InvalidExcelPath(path=path)
+        columns = _frameColumns(raw, list(raw.columns))
+        if sidecar:
+            writeSidecar(path, sheet, columns, sidecarDir)
+        workbookCache.put(path, sheet, columns)
+    if not set(columnNames).issubset(columns):
+        raise ColumnNameError
+    return subdivisionFromColumns([columns[name] for name in columnNames], columnNames)
+
+
+def subdivisionFromCSV(path: str, columnNames: list) -> Subdivision:
+    """Creates a subdivision from a CSV file. Only columnNames are parsed."""
+    wanted = set(columnNames)
     try:
-        raw = read_excel(path)
-    except:
-        raise InvalidExcelPath(path=path)
+        raw = read_csv(path, usecols=lambda name: name in wanted)
+    except (OSError, ValueError):
+        raise InvalidFilePath(path=path)
+    return _subdivisionFromFrame(raw, columnNames)
+
+
+def subdivisionFromParquet(path: str, columnNames: list) -> Subdivision:
+    """Creates a subdivision from a Parquet file. Only columnNames are read. Needs pyarrow installed."""
     try:
-        droped_columns = raw.columns.drop(columnNames)
+        raw = read_parquet(path, columns=columnNames)
+    except (OSError, ValueError):
+        raise InvalidFilePath(path=path)
     except KeyError:
         raise ColumnNameError
-    raw.drop(labels=droped_columns, axis="columns", inplace=True)
-    messycolumns = []
-    messyColumnNames = []  # Used later to order the columns correctly
-    for name, content in raw.items():
-        messyColumnNames.append(name)
-        rows = []
-        for i in content:
-            rows.append(i)
-        messycolumns.append(rows)
-
-    # Create a list with garbage placeholders to overwrite
-    columns = [i for i in range(len(columnNames))]
-    for index, name in enumerate(columnNames):
-        columns[index] = messycolumns[messyColumnNames.index(name)]
-        # Fill placeholder list with columns in the correct order.
-
-    matrix = matrixFromColumns(columns)
-    new_subdivision = Subdivision(matrix, columnNames)
-    return new_subdivision
\ No newline at end of file
+    return _subdivisionFromFrame(raw, columnNames)
+
+
+def _subdivisionFromFrame(raw, columnNames: list) -> Subdivision:
+    """Hands the DataFrame's column buffers to a new subdivision, in the order of columnNames."""
+    if not set(columnNames).issubset(raw.columns):
+        raise ColumnNameError
+    columns = _frameColumns(raw, columnNames)
+    return subdivisionFromColumns([columns[name] for name in columnNames], columnNames)
+
+
+def _frameColumns(raw, columnNames: list) -> dict:
+    """Column name -> typed array for the DataFrame columns."""
+    columns = {}
+    for name in columnNames:
+        series = raw[name]
+        if series.dtype.kind in "biuf":
+            columns[name] = series.to_numpy()
+        else:
+            columns[name] = _toArray(series.to_numpy(dtype=object))  # Text is encoded, dates and mixed cells stay python objects
+    return columns
+
+
+def _toArray(values) -> np.ndarray:
+    """
+    Stores a column as a numeric array where possible, as a DictionaryColumn if it holds text,
+    and as an object array otherwise.
+    """
+    if isinstance(values, DictionaryColumn):
+        return values
+    if isinstance(values, np.ndarray) and values.ndim == 1 and values.dtype.kind in "biuf":
+        return values
+    if isinstance(values, np.ndarray) and values.ndim == 1 and values.dtype.kind == "O":
+        objects = values
+    else:
+        array = np.asarray(values)
+        if array.ndim == 1 and array.dtype.kind in "biuf":
+            return array
+        # Strings or mixed columns. Copied cell by cell so numpy does not coerce mixed values into text.
+        objects = np.empty(len(values), dtype=object)
+        for index, value in enumerate(values):
+            objects[index] = value
+    encoded = encodeStrings(objects)
+    return objects if encoded is None else encoded
+
+
+def _concatenate(old, added):
+    """One column followed by another, keeping the dictionary encoding when both are encoded."""
+    if isinstance(old, DictionaryColumn) and isinstance(added, DictionaryColumn):
+        return old.concatenate(added)
+    if isinstance(old, DictionaryColumn):
+        old = old.decode()
+    if isinstance(added, DictionaryColumn):
+        added = added.decode()
+    return _toArray(np.concatenate([old, added]))
+
+
+def _nanMask(array: np.ndarray) -> np.ndarray:
+    """True where the cell is NaN."""
+    if isinstance(array, DictionaryColumn):
+        return array.missing()
+    if array.dtype.kind == "f":
+        return np.isnan(array)
+    if array.dtype.kind == "O":
+        return np.fromiter((str(cell) == "nan" for cell in array), dtype=bool, count=len(array))
+    return np.zeros(len(array), dtype=bool)
+
+
+def _arrayType(array: np.ndarray) -> type:
+    """The python type a cell of the array turns into."""
+    match array.dtype.kind:
+        case "f":
+            return float
+        case "i" | "u":
+            return int
+        case "b":
+            return bool
+    if len(array) == 0:
+        return object
+    return type(array[0])
@@ -0,0 +1,77 @@
+import numpy as np
+from functools import lru_cache
+from importlib import resources
+from math import isnan
+from scipy.stats import t as student_t
+"""
+Critical PMCC values for one tailed hypothesis tests of no correlation.
+- The printed table in resources/pearson_values.csv, loaded once into an array, with linear interpolation
+  between its rows for the mark scheme.
+- Exact values from the inverse of the t distribution, for any n and significance level.
+"""
+
+SIG_LEVELS = [0.1, 0.05, 0.025, 0.01, 0.005]  # Columns of the table, in order
+TABLE_MIN_N = 4
+TABLE_MAX_N = 100
+
+
+@lru_cache(maxsize=None)
+def criticalTable() -> np.ndarray:
+    """
+    The table as an array indexed [n, SIG_LEVELS index]. Rows for n missing from the file are NaN.
+    Read from the package resources the first time it is needed, so the working directory does not matter.
+    """
+    text = resources.files("Shortcourse").joinpath("resources/pearson_values.csv").read_text(encoding="utf-8-sig")
+    table = np.full((TABLE_MAX_N + 1, len(SIG_LEVELS)), np.nan)
+    for index, line in enumerate(text.splitlines()):
+        if index == 0 or line.strip() == "":  # Warning line
+            continue
+        splits = [float(i.strip()) for i in line.split(",")]
+        table[int(splits.pop())] = splits
+    table.flags.writeable = False
+    return table
+
+
+def tableCritical(n: int, sig_level: float = 0.05) -> tuple:
+    """
+    Returns (critical value, interpolated) from the table. n that are not in the table are linearly
+    interpolated between the tens on either side. Raises ValueError outside the table.
+    """
+    if sig_level not in SIG_LEVELS:
+        raise ValueError(f"Only these sig levels are in the table: {SIG_LEVELS}")
+    if n < TABLE_MIN_N or n > TABLE_MAX_N:
+        raise ValueError(f"The n value: {n} is outside the table range")
+    table = criticalTable()
+    column = SIG_LEVELS.index(sig_level)
+    value = table[n, column]
+    if not isnan(value):
+        return float(value), False
+
+    low_n = n // 10 * 10
+    high_n = low_n + 10
+    low_c = table[low_n, column]
+    high_c = table[high_n, column]
+    cvalue = ((n-low_n) * (high_c-low_c)/(high_n-low_n)) + low_c
+    return float(cvalue), True
+
+
+def exactCritical(n: int, sig_level: float = 0.05) -> float:
+    """Exact critical PMCC of a one tailed test on n pairs. Memoized, so repeated tests cost nothing."""
+    return _exactCritical(int(n), float(sig_level))
+
+
+@lru_cache(maxsize=4096)
+def _exactCritical(n: int, sig_level: float) -> float:
+    return float(exactCriticals(n, sig_level))
+
+
+def exactCriticals(n, sig_level: float = 0.05) -> np.ndarray:
+    """
+    Exact critical PMCC values for an array of n, in one vectorized call.
+    r = t / sqrt(df + t^2) where t is the upper sig_level point of the t distribution with df = n - 2.
+    n below 3 gives NaN.
+    """
+    df = np.asarray(n, dtype=np.float64) - 2
+    with np.errstate(invalid="ignore"):
+        t = student_t.ppf(1 - sig_level, np.where(df > 0, df, np.nan))
+        return t / np.sqrt(df + t*t)
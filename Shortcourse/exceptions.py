@@ -20,6 +20,12 @@ class InvalidExcelPath(Exception):
         self.message = f"Excel document not found at path: {path}"
         super().__init__(self.message)
 
+class InvalidFilePath(Exception):
+    """Raised when a data file can not be read from the provided path"""
+    def __init__(self, path="Missing."):
+        self.message = f"Data file could not be read at path: {path}"
+        super().__init__(self.message)
+
 class DirtyData(Exception):
     """Raised when \"Not a Number\" values are found in data"""
     def __init__(self):
@@ -0,0 +1,133 @@
+import numpy as np
+from math import nan
+from pandas import factorize
+from Shortcourse import kernels
+"""
+Partitioning a subdivision by the values of a categorical column.
+"""
+
+class GroupBy():
+    """
+    Entries (rows) of a subdivision partitioned by the value in one column, built in one hashing pass.
+    Entries with NaN in the column are left out.
+
+    Indexing with a value gives the group as a subdivision that shares the parent's data.
+    Aggregate methods return a dictionary of value -> result, computed for all groups at once.
+    Groups too small for a statistic get NaN instead of raising.
+    The grouping is a snapshot: changing the subdivision afterwards does not change the groups.
+
+    Properties:
+    - .subdivision -> the subdivision that was grouped.
+    - .columnName -> the column holding the group values.
+    - .keys -> the group values, in order of first appearance.
+    """
+
+    def __init__(self, subdivision, columnName: str) -> None:
+        self.subdivision = subdivision.clone()  # Shares the data, but is not affected by later changes
+        self.columnName = columnName
+        codes, self.keys = _factorize(subdivision, columnName)
+        self._valid = np.flatnonzero(codes >= 0)
+        self._codes = codes[self._valid]
+        self._counts = np.bincount(self._codes, minlength=len(self.keys))
+        order = self._valid[np.argsort(self._codes, kind="stable")]  # Stable keeps table order inside a group
+        self._indices = dict(zip(self.keys, np.split(order, np.cumsum(self._counts)[:-1])))
+        self._groups = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __iter__(self):
+        for key in self.keys:
+            yield key, self[key]
+
+    def __getitem__(self, key):
+        """Returns the group as a subdivision. It is only built the first time it is asked for."""
+        if key not in self._indices:
+            raise KeyError(f"{key} is not a value of {self.columnName}")
+        if key not in self._groups:
+            self._groups[key] = self.subdivision.selectEntries(self._indices[key])
+        return self._groups[key]
+
+    def indexes(self, key) -> list:
+        """Returns the indexes of the entries in the group."""
+        return self._indices[key].tolist()
+
+    def sizes(self) -> dict:
+        """Returns the number of entries in every group."""
+        return dict(zip(self.keys, self._counts.tolist()))
+
+    def mean(self, columnName: str) -> dict:
+        """Returns the mean of the column in every group."""
+        x = self._values(columnName)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.bincount(self._codes, weights=x, minlength=len(self.keys)) / self._counts
+        return dict(zip(self.keys, means.tolist()))
+
+    def stdev(self, columnName: str) -> dict:
+        """Returns the sample standard deviation of the column in every group."""
+        x = self._values(columnName)
+        dx = self._centred(x)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            variances = np.bincount(self._codes, weights=dx*dx, minlength=len(self.keys)) / (self._counts - 1)
+        variances[self._counts < 2] = nan
+        return dict(zip(self.keys, np.sqrt(variances).tolist()))
+
+    def quartiles(self, columnName: str) -> dict:
+        """Returns [Q1, Q2, Q3] of the column in every group, by the same method as quartileValue."""
+        x = self._values(columnName)
+        order = np.lexsort((x, self._codes))  # One sort by group, then by value
+        ordered = x[order]
+        result = {}
+        start = 0
+        for key, count in zip(self.keys, self._counts.tolist()):
+            if count < 2:
+                result[key] = [nan, nan, nan]
+            else:
+                group = ordered[start:start + count]
+                result[key] = kernels._cuts(group, kernels._cutPositions(count, 4), 4)
+            start += count
+        return result
+
+    def quartileValue(self, columnName: str, q: int = 1) -> dict:
+        """Returns quartile q of the column in every group."""
+        return {key: cuts[q-1] for key, cuts in self.quartiles(columnName).items()}
+
+    def pmcc(self, columnNameX: str, columnNameY: str) -> dict:
+        """Returns the pmcc of the two columns in every group."""
+        dx = self._centred(self._values(columnNameX))
+        dy = self._centred(self._values(columnNameY))
+        k = len(self.keys)
+        sxy = np.bincount(self._codes, weights=dx*dy, minlength=k)
+        sxx = np.bincount(self._codes, weights=dx*dx, minlength=k)
+        syy = np.bincount(self._codes, weights=dy*dy, minlength=k)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            r = sxy / np.sqrt(sxx * syy)
+        r[self._counts < 2] = nan
+        return dict(zip(self.keys, r.tolist()))
+
+    def _values(self, columnName: str) -> np.ndarray:
+        """The numeric column restricted to entries that belong to a group, as float64."""
+        array = self.subdivision._numeric(columnName)
+        if array is None:
+            raise ValueError(f"{columnName} is not a numeric column")
+        return array[self._valid].astype(np.float64, copy=False)
+
+    def _centred(self, x: np.ndarray) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.bincount(self._codes, weights=x, minlength=len(self.keys)) / self._counts
+        return x - means[self._codes]
+
+
+def _factorize(subdivision, columnName: str) -> tuple:
+    """Group code of every entry (-1 for NaN) and the group values, in order of first appearance."""
+    dictionary = subdivision._dictionary(subdivision._columnIndex(columnName))
+    if dictionary is None:
+        codes, uniques = factorize(subdivision._array(columnName))
+        return codes, uniques.tolist()
+    codes, uniques = factorize(dictionary.codes)  # Integer codes hash much faster than the strings
+    missing = np.flatnonzero(uniques < 0)
+    if len(missing) > 0:  # NaN (code -1) became a group of its own
+        codes[codes == missing[0]] = -1
+        codes[codes > missing[0]] -= 1
+        uniques = np.delete(uniques, missing[0])
+    return codes, dictionary.values[uniques].tolist()
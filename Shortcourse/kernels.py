@@ -0,0 +1,307 @@
+import numpy as np
+from decimal import Decimal, ROUND_HALF_UP
+from math import sqrt
+from pandas import factorize
+from scipy.stats import t as student_t
+from statistics import StatisticsError
+"""
+NumPy versions of the statistics functions used by the maths Mixin.
+They work on whole numeric arrays and follow the statistics module: the same quantile method,
+the same return types and the same errors.
+"""
+
+def mean(array: np.ndarray):
+    """Mean of the array. Integer arrays give an int when the mean is whole, like statistics.mean."""
+    n = len(array)
+    if n < 1:
+        raise StatisticsError("mean requires at least one data point")
+    if array.dtype.kind in "iu":
+        return integerMean(int(array.sum()), n)
+    return float(np.mean(array))
+
+
+def integerMean(total: int, n: int):
+    """Mean of n integers with an exact total: an int when it is whole, else a float."""
+    if total % n == 0:
+        return total // n
+    return total / n
+
+
+def stdev(array: np.ndarray) -> float:
+    """Sample standard deviation of the array."""
+    if len(array) < 2:
+        raise StatisticsError("stdev requires at least two data points")
+    return float(np.std(array, ddof=1))
+
+
+def quantiles(array: np.ndarray, n: int = 4) -> list:
+    """
+    Cut points dividing the array into n groups, using the "exclusive" method of statistics.quantiles.
+    Only the values next to each cut are needed, so the array is partitioned instead of fully sorted.
+    """
+    positions = _cutPositions(len(array), n)
+    needed = sorted({j - 1 for j, delta in positions} | {j for j, delta in positions})
+    return _cuts(np.partition(array, needed), positions, n)
+
+
+def summary(array: np.ndarray, ordered: np.ndarray = None) -> dict:
+    """
+    Count, mean, stdev, min, quartiles, IQR, max and the 1.5*IQR fences of the array from a single sort.
+    ordered is the array already sorted, if it is at hand.
+    """
+    if ordered is None:
+        ordered = np.sort(array)
+    q1, q2, q3 = _cuts(ordered, _cutPositions(len(ordered), 4), 4)
+    iqr = q3 - q1
+    return {
+        "count": len(ordered),
+        "mean": mean(array),
+        "stdev": stdev(array),
+        "min": ordered[0].item(),
+        "q1": q1,
+        "q2": q2,
+        "q3": q3,
+        "iqr": iqr,
+        "max": ordered[-1].item(),
+        "lower_fence": q1 - 1.5 * iqr,
+        "upper_fence": q3 + 1.5 * iqr,
+    }
+
+
+def roundSigfigs(values, sigfigs: int = 3):
+    """
+    Rounds to sigfigs significant figures, like sigfig.round, over a whole array at once.
+    sigfig.round rounds halves away from zero on the value's decimal digits, so 0.0145 gives 0.015 even though
+    it is stored just below it. Scaling by a power of ten and rounding in binary agrees with that for every
+    value that is not within a few units in the last place of a half, and whose power of ten is exact (at most 1e22).
+    The few other values (ties, and magnitudes beyond that) are rounded on their decimal digits one by one.
+    Integer arrays stay integer, and 0, NaN and inf are left as they are. A scalar gives a python number.
+    """
+    array = np.asarray(values)
+    x = array.astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        decimals = sigfigs - 1 - np.floor(np.log10(np.abs(x)))
+        valid = np.isfinite(decimals)  # Not 0, NaN or inf
+        exact = valid & (np.abs(decimals) <= 22)  # Powers of ten up to 1e22 are exact floats
+        scale = 10.0 ** np.where(exact, np.abs(decimals), 0)
+        up = decimals >= 0
+        scaled = np.where(up, np.abs(x) * scale, np.abs(x) / scale)  # Only one rounding error
+        whole = np.floor(scaled + 0.5)
+        result = np.where(exact, np.copysign(np.where(up, whole / scale, whole * scale), x), x)
+        fraction = scaled - np.floor(scaled)
+        ambiguous = valid & (~exact | (np.abs(fraction - 0.5) <= 8 * np.spacing(scaled)))
+    if ambiguous.any():
+        result = np.array(result, ndmin=1)
+        mask = ambiguous.reshape(result.shape)
+        distinct, inverse = np.unique(np.array(x, ndmin=1)[mask], return_inverse=True)  # Each value is done once
+        rounded = np.array([_roundSigfigsDecimal(value, sigfigs) for value in distinct.tolist()])
+        result[mask] = rounded[inverse.reshape(-1)]
+        result = result.reshape(np.shape(x))
+    if array.dtype.kind in "iu":
+        result = result.astype(array.dtype)
+    if result.ndim == 0:
+        return result.item()
+    return result
+
+
+def _roundSigfigsDecimal(value: float, sigfigs: int) -> float:
+    """Rounds value's shortest decimal representation (its repr) half away from zero, like sigfig.round."""
+    digits = Decimal(repr(value))
+    return float(digits.quantize(Decimal(1).scaleb(digits.adjusted() - sigfigs + 1), rounding=ROUND_HALF_UP))
+
+
+def classify(values: np.ndarray, cuts: list) -> np.ndarray:
+    """
+    Group number (1 to len(cuts)+1) of every value, by binary search over the sorted cuts.
+    A value equal to a cut goes into the group above it, like findQuartile.
+    """
+    return np.searchsorted(cuts, values, side="right") + 1
+
+
+def rank(array: np.ndarray, order: np.ndarray = None) -> np.ndarray:
+    """
+    Dense rank of every value. Equal values share a rank and NaN ranks last.
+    order is the stable argsort of a numeric array, if it is at hand.
+    Raises TypeError if the values of an object array can not be compared.
+    """
+    if array.dtype.kind == "O":
+        ranks, uniques = factorize(array, sort=True)
+        ranks[ranks < 0] = len(uniques)
+        return ranks
+    if order is None:
+        order = np.argsort(array, kind="stable")
+    ordered = array[order]
+    ranks = np.empty(len(array), dtype=np.intp)
+    ranks[order] = np.concatenate(([0], np.cumsum(ordered[1:] != ordered[:-1])))
+    return ranks
+
+
+def _cutPositions(ld: int, n: int) -> list:
+    """(j, delta) pairs of the exclusive quantile method for ld data points."""
+    if n < 1:
+        raise StatisticsError("n must be at least 1")
+    if ld < 2:
+        raise StatisticsError("must have at least two data points")
+    m = ld + 1
+    positions = []
+    for i in range(1, n):
+        j = i * m // n
+        j = 1 if j < 1 else ld-1 if j > ld-1 else j  # clamp to 1 .. ld-1
+        positions.append((j, i*m - j*n))
+    return positions
+
+
+def _cuts(ordered: np.ndarray, positions: list, n: int) -> list:
+    """Interpolates the cut points. ordered only has to be sorted around the positions."""
+    result = []
+    for j, delta in positions:
+        # Same arithmetic on python scalars as statistics.quantiles, so the cuts are identical.
+        low = ordered[j - 1].item()
+        high = ordered[j].item()
+        result.append((low * (n - delta) + high * delta) / n)
+    return result
+
+
+def _centred(x: np.ndarray, y: np.ndarray) -> tuple:
+    n = len(x)
+    if len(y) != n:
+        raise StatisticsError("both inputs must have the same number of data points")
+    if n < 2:
+        raise StatisticsError("at least two data points are required")
+    x = x.astype(np.float64, copy=False)
+    y = y.astype(np.float64, copy=False)
+    xbar = float(np.mean(x))
+    ybar = float(np.mean(y))
+    return x - xbar, y - ybar, xbar, ybar
+
+
+def correlation(x: np.ndarray, y: np.ndarray) -> float:
+    """Pearson's correlation coefficient of two arrays."""
+    dx, dy, xbar, ybar = _centred(x, y)
+    sxy = float(np.dot(dx, dy))
+    sxx = float(np.dot(dx, dx))
+    syy = float(np.dot(dy, dy))
+    try:
+        return sxy / sqrt(sxx * syy)
+    except ZeroDivisionError:
+        raise StatisticsError("at least one of the inputs is constant")
+
+
+def linear_regression(x: np.ndarray, y: np.ndarray) -> tuple:
+    """Least squares slope and intercept of y on x."""
+    dx, dy, xbar, ybar = _centred(x, y)
+    sxy = float(np.dot(dx, dy))
+    sxx = float(np.dot(dx, dx))
+    try:
+        slope = sxy / sxx
+    except ZeroDivisionError:
+        raise StatisticsError("x is constant")
+    return slope, ybar - slope * xbar
+
+
+def regressionFit(x: np.ndarray, y: np.ndarray) -> dict:
+    """
+    Least squares fit of y on x with its sufficient statistics, from one pass over the centred arrays:
+    n, xbar, ybar, sxx, syy, sxy, slope, intercept, r, sse (residual sum of squares),
+    residual_se (standard error of the residuals, NaN for n < 3), xmin and xmax.
+    """
+    dx, dy, xbar, ybar = _centred(x, y)
+    n = len(dx)
+    sxy = float(np.dot(dx, dy))
+    sxx = float(np.dot(dx, dx))
+    syy = float(np.dot(dy, dy))
+    if sxx == 0:
+        raise StatisticsError("x is constant")
+    slope = sxy / sxx
+    sse = max(syy - slope * sxy, 0.0)  # Rounding can make a perfect fit slightly negative
+    return {
+        "n": n,
+        "xbar": xbar,
+        "ybar": ybar,
+        "sxx": sxx,
+        "syy": syy,
+        "sxy": sxy,
+        "slope": slope,
+        "intercept": ybar - slope * xbar,
+        "r": sxy / sqrt(sxx * syy) if syy > 0 else float("nan"),
+        "sse": sse,
+        "residual_se": sqrt(sse / (n - 2)) if n > 2 else float("nan"),
+        "xmin": float(np.min(x)),
+        "xmax": float(np.max(x)),
+    }
+
+
+def confidenceBand(fit: dict, x, level: float = 0.95, prediction: bool = False) -> tuple:
+    """
+    Lower and upper edges of the confidence band of the fitted line at every x, from a regressionFit.
+    With prediction, the wider band for a single new observation is given instead.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n = fit["n"]
+    t = student_t.ppf(0.5 + level / 2, n - 2) if n > 2 else np.nan
+    spread = 1 / n + (x - fit["xbar"]) ** 2 / fit["sxx"]
+    if prediction:
+        spread = spread + 1
+    y = fit["slope"] * x + fit["intercept"]
+    half = t * fit["residual_se"] * np.sqrt(spread)
+    return y - half, y + half
+
+
+def correlationMatrix(data: np.ndarray) -> np.ndarray:
+    """
+    Pearson's correlation coefficient of every pair of columns of the 2D array, as one matrix product
+    of the centred and normalised columns.
+    """
+    if data.shape[0] < 2:
+        raise StatisticsError("at least two data points are required")
+    centred = data - data.mean(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        standardised = centred / np.sqrt(np.einsum("ij,ij->j", centred, centred))
+    r = standardised.T @ standardised
+    np.clip(r, -1.0, 1.0, out=r)  # Rounding can push perfect correlations just past 1
+    diagonal = np.diag_indices_from(r)
+    r[diagonal] = np.where(np.isnan(r[diagonal]), np.nan, 1.0)  # Constant columns stay NaN
+    return r
+
+
+def correlationPValues(r, n: int, alternative: str = "two-sided") -> np.ndarray:
+    """
+    p-values of pmcc values r from n pairs, testing for no correlation like scipy's pearsonr.
+    alternative is "two-sided", "greater" or "less".
+    """
+    r = np.asarray(r, dtype=np.float64)
+    df = n - 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = r * np.sqrt(df / ((1.0 - r) * (1.0 + r)))
+    match alternative:
+        case "two-sided":
+            return np.minimum(2 * student_t.sf(np.abs(t), df), 1.0)
+        case "greater":
+            return student_t.sf(t, df)
+        case "less":
+            return student_t.cdf(t, df)
+    raise ValueError(f"Invalid alternative: {alternative}")
+
+
+def adjustPValues(p, method: str = None) -> np.ndarray:
+    """
+    Corrects p-values for multiple comparisons.
+    method is None (no correction), "bonferroni", "holm" or "fdr_bh" (Benjamini-Hochberg).
+    """
+    p = np.asarray(p, dtype=np.float64)
+    m = len(p)
+    if method == None or m == 0:
+        return p
+    if method == "bonferroni":
+        return np.minimum(p * m, 1.0)
+    order = np.argsort(p, kind="stable")
+    ordered = p[order]
+    if method == "holm":
+        adjusted = np.maximum.accumulate(ordered * (m - np.arange(m)))
+    elif method == "fdr_bh":
+        adjusted = np.minimum.accumulate((ordered * m / np.arange(1, m + 1))[::-1])[::-1]
+    else:
+        raise ValueError(f"Invalid correction method: {method}")
+    result = np.empty(m)
+    result[order] = np.minimum(adjusted, 1.0)
+    return result
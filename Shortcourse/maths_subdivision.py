@@ -1,54 +1,140 @@
 from Shortcourse.exceptions import DirtyData
-import sigfig as sig
+from Shortcourse import kernels
+from Shortcourse.criticals import SIG_LEVELS, TABLE_MIN_N, TABLE_MAX_N, tableCritical, exactCritical
+import numpy as np
 import statistics as stats
-from typing import Tuple, Callable, Optional
+from typing import Tuple, Callable
+from Shortcourse.results import HypothesisResult, BootstrapResult, PermutationResult
+from Shortcourse import resampling
+from Shortcourse.streaming import RunningStats, RunningPair, QuantileSketch
 from scipy.stats import pearsonr
 
 class Mixin():
-    def round_entries(self, sigfig: int = 3, columnNames: list = None) -> None:
-        """Rounds all entries in columnNames."""
+    def _numeric(self, columnName: str):
+        """
+        Returns the numeric array behind the column for the numpy kernels.
+        None means the column holds other python objects and the statistics module is used instead.
+        """
+        array = self._array(columnName)
+        if array.dtype.kind in "iuf":
+            return array
+        return None
+
+    def _summary(self, columnName: str) -> dict:
+        """Cached describe() statistics of one column. Emptied with the other caches when the data changes."""
+        if self.getColumnType(columnName) not in [float, int]:
+            raise ValueError
+        key = ("summary", self._columnIndex(columnName))
+        if key not in self._cache:
+            array = self._numeric(columnName)
+            if array is not None:
+                ordered = array[self._sortIndex(key[1])]  # The column's sort is cached and shared with sortEntryValue
+                self._cache[key] = kernels.summary(array, ordered)
+            else:
+                column = self.getColumn(columnName)
+                q1, q2, q3 = stats.quantiles(column)
+                iqr = q3 - q1
+                self._cache[key] = {
+                    "count": len(column),
+                    "mean": stats.mean(column),
+                    "stdev": stats.stdev(column),
+                    "min": min(column),
+                    "q1": q1,
+                    "q2": q2,
+                    "q3": q3,
+                    "iqr": iqr,
+                    "max": max(column),
+                    "lower_fence": q1 - 1.5 * iqr,
+                    "upper_fence": q3 + 1.5 * iqr,
+                }
+        return self._cache[key]
+
+    def _runningStat(self, kind: str, *columnNames):
+        """
+        The running statistic of the columns kept by appendEntries ("stats", "pair" or "sketch").
+        It is built from the whole column the first time it is asked for and updated by every append after that.
+        None if nothing has been appended or a column is not numerical.
+        """
+        if self._running is None:
+            return None
+        arrays = [self._numeric(columnName) for columnName in columnNames]
+        if any(array is None for array in arrays):
+            return None
+        key = (kind, *(self._columnIndex(columnName) for columnName in columnNames))
+        if key not in self._running:
+            self._running[key] = {"stats": RunningStats, "pair": RunningPair, "sketch": QuantileSketch}[kind](*arrays)
+        return self._running[key]
+
+    def describe(self, columnNames: list = None) -> dict:
+        """
+        Returns summary statistics for every column in columnNames, keyed by column name.
+        Each summary has count, mean, stdev, min, q1, q2, q3, iqr, max, lower_fence and upper_fence (1.5IQR).
+        Every column is sorted once and the result is reused by the quartile methods until the data changes.
+        """
+        if columnNames == None:
+            columnNames = [name for name, kind in zip(self.columnNames, self.columnTypes) if kind in [float, int]]
+        return {columnName: dict(self._summary(columnName)) for columnName in columnNames}
+
+    def round_entries(self, sigfig: int = 3, columnNames: list = None, display: bool = False):
+        """
+        Rounds all entries in columnNames (all numerical columns by default) to sigfig significant figures.
+        Other columns are left as they are. Each column is rounded as a whole array (see kernels.roundSigfigs).
+
+        With display, the subdivision is not changed. A rounded copy for printing is returned instead,
+        which shares the columns that were not rounded. The rounded columns are cached until the data changes.
+        """
         if self.metadata["clean"] == False:
             raise DirtyData
         # Round all values with columnNames
         if columnNames == None:
             columnNames = self.columnNames  # Round all columns
 
-        new_columns = []
+        rounded = {}
         for columnName in columnNames:
-            column = self.getColumn(columnName)
-            if type(column[0]) not in [float, int]:  # skip non-numerical columns
+            index = self._columnIndex(columnName)
+            if self._numeric(columnName) is None:  # skip non-numerical columns
                 continue
-            new_column = []
-            for cell in column:
-                new_column.append(sig.round(cell, sigfigs=sigfig))
-            new_columns.append(new_column)
-
-        self.columns = new_columns
+            key = ("rounded", index, sigfig)
+            if key not in self._cache:
+                self._cache[key] = kernels.roundSigfigs(self._column(index), sigfig)
+            rounded[index] = self._cache[key]
+
+        if display:
+            columns = [rounded[index] if index in rounded else self._column(index) for index in range(len(self.columnNames))]
+            result = self._new(columns, list(self.columnNames))
+            result.metadata = dict(self.metadata, rounded=True)
+            return result
+
+        self._materialize()
+        self._data = [rounded.get(index, array) for index, array in enumerate(self._data)]
+        self._invalidate()
         self.metadata["rounded"] = True
 
-    def quartileValue(self, columnName: str, q: int = 1) -> float:
+    def quartileValue(self, columnName: str, q: int = 1, approximate: bool = False) -> float:
         """
         Calculates the greatest value to fall into quartile q.
+        With approximate, after appendEntries the quartile comes from a running sketch instead of sorting
+        the whole column again (see streaming.QuantileSketch).
         """
-        if self.getColumnType(columnName) not in [float, int]:
-            raise ValueError  # Maybe write a custom exception
-        column = self.getColumn(columnName)
-        cuts = stats.quantiles(column)
+        sketch = self._runningStat("sketch", columnName) if approximate else None
+        if sketch is not None:
+            return sketch.quantiles()[q-1]
+        summary = self._summary(columnName)
+        cuts = [summary["q1"], summary["q2"], summary["q3"]]
         return cuts[q-1]
 
     def quartileRange(self, columnName: str) -> float:
         """
         Returns the interquartile range for the column.
         """
-        return self.quartileValue(columnName, q=3) - self.quartileValue(columnName, q=1)
+        return self._summary(columnName)["iqr"]
 
     def findQuartile(self, columnName: str, value) -> int:
         """
         Returns the quartile in which the value is located.
         """
-        q1 = self.quartileValue(columnName, q=1)
-        q2 = self.quartileValue(columnName, q=2)
-        q3 = self.quartileValue(columnName, q=3)
+        summary = self._summary(columnName)
+        q1, q2, q3 = summary["q1"], summary["q2"], summary["q3"]
 
         if value < q1:
             return 1
@@ -59,65 +145,103 @@ class Mixin():
         else:
             return 4
 
-    def remove_outliers(self, columnNameX: str = None, columnNameY: str = None, boxplot: bool = False) -> list:
+    def findQuartiles(self, columnName: str, values: list = None) -> list:
+        """
+        Returns the quartile of every value, using the quartiles of columnName.
+        If values is not given, every cell of columnName is classified.
         """
-        Removes outliers in both the x and y columns and returns them.
+        summary = self._summary(columnName)
+        if values is None:
+            values = self._numeric(columnName)
+            if values is None:
+                values = self.getColumn(columnName)
+        cuts = [summary["q1"], summary["q2"], summary["q3"]]
+        return kernels.classify(np.asarray(values, dtype=np.float64), cuts).tolist()
+
+    def addQuartileColumn(self, columnName: str, newColumnName: str = None) -> None:
+        """
+        Adds a column holding the quartile (1-4) of every entry in columnName.
+        The new column is called "<columnName>_quartile" unless newColumnName is given.
+        """
+        if newColumnName == None:
+            newColumnName = f"{columnName}_quartile"
+        self.addColumn(newColumnName, self.findQuartiles(columnName))
+
+    def findOutliers(self, columnNames: list = None, rule: str = "iqr", threshold: float = None) -> dict:
+        """
+        Finds the outliers of every column in columnNames (all numerical columns by default) without removing them.
+        Returns a dictionary of columnName -> (low indexes, high indexes), as index arrays.
+
+        The following rules are supported:
+        - "iqr" -> below Q1 - threshold*IQR or above Q3 + threshold*IQR. threshold is 1.5 by default.
+        - "zscore" -> more than threshold standard deviations from the mean. threshold is 3 by default.
+        - "mad" -> more than threshold scaled median absolute deviations (1.4826 * MAD) from the median.
+          threshold is 3.5 by default.
+
+        The fences of each column are found once, then every column is compared with them in one pass.
+        """
+        if columnNames == None:
+            columnNames = [name for name, kind in zip(self.columnNames, self.columnTypes) if kind in [float, int]]
+        columnNames, data = self._numericMatrix(columnNames)
+        fences = np.array([self._fences(columnName, rule, threshold) for columnName in columnNames]).reshape(-1, 2)
+        low = data < fences[:, 0]
+        high = data > fences[:, 1]
+        return {name: (np.flatnonzero(low[:, i]), np.flatnonzero(high[:, i])) for i, name in enumerate(columnNames)}
+
+    def _fences(self, columnName: str, rule: str = "iqr", threshold: float = None) -> tuple:
+        """Lower and upper outlier fences of the column by the rule (see findOutliers)."""
+        summary = self._summary(columnName)
+        match rule:
+            case "iqr":
+                threshold = 1.5 if threshold == None else threshold
+                return summary["q1"] - threshold * summary["iqr"], summary["q3"] + threshold * summary["iqr"]
+            case "zscore":
+                threshold = 3 if threshold == None else threshold
+                return summary["mean"] - threshold * summary["stdev"], summary["mean"] + threshold * summary["stdev"]
+            case "mad":
+                threshold = 3.5 if threshold == None else threshold
+                median = summary["q2"]
+                spread = 1.4826 * float(np.median(np.abs(self._numeric(columnName) - median)))
+                return median - threshold * spread, median + threshold * spread
+        raise ValueError(f"Unknown outlier rule: {rule}")
+
+    def remove_outliers(self, columnNameX: str = None, columnNameY: str = None, boxplot: bool = False,
+                        rule: str = "iqr", threshold: float = None, remove: bool = True) -> list:
+        """
+        Finds the outliers in the x and y columns (1.5IQR by default, see findOutliers for the other rules),
+        removes them unless remove is False, and returns them as entries.
+
+        The outliers are kept on the subdivision for plotMultiOutliers and print_outliers: their indexes from
+        before the removal in .low_x_indices, .high_x_indices, .low_y_indices and .high_y_indices, and the entries
+        in .bottom_outlier_entries, .top_outlier_entries and .outliers.
+        An entry that is an x outlier is not also listed as a y outlier, unless boxplot is True.
+        Without columnNameY, only the x column is checked.
         """
         if (columnNameX == None) and (columnNameY == None):
             columnNameX = self.columnNames[0]
             columnNameY = self.columnNames[1]
 
-        x = self.getColumn(columnNameX)
-        y = self.getColumn(columnNameY)
-
-        topX = self.quartileValue(columnNameX, 3) + \
-            1.5 * self.quartileRange(columnNameX)
-        bottomX = self.quartileValue(
-            columnNameX, 1) - 1.5 * self.quartileRange(columnNameX)
-        topY = self.quartileValue(columnNameY, 3) + \
-            1.5 * self.quartileRange(columnNameY)
-        bottomY = self.quartileValue(
-            columnNameY, 1) - 1.5 * self.quartileRange(columnNameY)
-
-        bottom_outlier_indices = []
-        top_outlier_indices = []
-
-        for index, entry in enumerate(x):
-            if entry > topX:
-                top_outlier_indices.append(index)
-                self.high_x_indices.append(index)
-            elif entry < bottomX:
-                bottom_outlier_indices.append(index)
-                self.low_x_indices.append(index)
-
+        columnNames = [columnNameX] if columnNameY == None else [columnNameX, columnNameY]
+        found = self.findOutliers(columnNames, rule, threshold)
+        low_x, high_x = found[columnNameX]
+        low_y, high_y = found.get(columnNameY, (low_x[:0], high_x[:0]))
         if not boxplot:
-            for index, entry in enumerate(y):
-                if entry > topY:
-                    if index not in top_outlier_indices:
-                        top_outlier_indices.append(index)
-                        self.high_y_indices.append(index)
-                elif entry < bottomY:
-                    if index not in bottom_outlier_indices:
-                        bottom_outlier_indices.append(index)
-                        self.low_y_indices.append(index)
-        else:
-            for index, entry in enumerate(y):
-                if entry > topY:
-                    top_outlier_indices.append(index)
-                    self.high_y_indices.append(self.matrix[index])
-                elif entry < bottomY:
-                    bottom_outlier_indices.append(index)
-                    self.low_y_indices.append(self.matrix[index])
-
-        self.bottom_outlier_entries = [self.matrix[index]
-                                        for index in bottom_outlier_indices]
-        self.top_outlier_entries = [self.matrix[index]
-                                    for index in top_outlier_indices]
-
-        self.remove_entries(bottom_outlier_indices + top_outlier_indices)
-
+            low_y = np.setdiff1d(low_y, low_x, assume_unique=True)
+            high_y = np.setdiff1d(high_y, high_x, assume_unique=True)
+
+        bottom = np.concatenate([low_x, np.setdiff1d(low_y, low_x, assume_unique=True)])
+        top = np.concatenate([high_x, np.setdiff1d(high_y, high_x, assume_unique=True)])
+
+        self.low_x_indices = low_x.tolist()
+        self.high_x_indices = high_x.tolist()
+        self.low_y_indices = low_y.tolist()
+        self.high_y_indices = high_y.tolist()
+        self.bottom_outlier_entries = self._entries(bottom)
+        self.top_outlier_entries = self._entries(top)
         self.outliers = self.top_outlier_entries + self.bottom_outlier_entries
 
+        if remove:
+            self.removeEntries(np.concatenate([bottom, top]))
         return self.outliers
 
     def mean(self, columnName: str) -> float:
@@ -128,26 +252,51 @@ class Mixin():
         if self.getColumnType(columnName) not in [float, int]:
             raise ValueError  # Maybe write a custom exception
 
-        column = self.getColumn(columnName)
-        return stats.mean(column)
+        running = self._runningStat("stats", columnName)
+        if running is not None and running.count > 0:
+            if running.total is not None:  # Integer column: same type of result as kernels.mean
+                return kernels.integerMean(running.total, running.count)
+            return running.mean
+        array = self._numeric(columnName)
+        if array is not None:
+            return kernels.mean(array)
+        return stats.mean(self.getColumn(columnName))
 
     def regression(self, columnNameX: str = None, columnNameY: str = None) -> Tuple[Callable, str]:
         """
         Returns function for drawing the regression line and string representation of function. 
         """
-        if len(self.columns) == 2 and (columnNameX == None and columnNameY == None):
+        fit = self.regressionFit(columnNameX, columnNameY)
+        slope, intercept = fit["slope"], fit["intercept"]
+        def equation(x): return slope * x + intercept
+        string_equation = f"y={kernels.roundSigfigs(slope, 3)}x + {kernels.roundSigfigs(intercept, 3)} (3s.f)"
+        return equation, string_equation
+
+    def regressionFit(self, columnNameX: str = None, columnNameY: str = None) -> dict:
+        """
+        Returns the least squares fit of columnNameY on columnNameX: slope, intercept, r, n, the means,
+        sxx, syy, sxy, sse, residual_se and the x range (see kernels.regressionFit).
+        The fit is cached until the data changes, so regression, addRegression and confidence bands share it.
+        """
+        if len(self.columnNames) == 2 and (columnNameX == None and columnNameY == None):
             columnNameX = self.columnNames[0]
             columnNameY = self.columnNames[1]
 
         if (self.getColumnType(columnNameX) and self.getColumnType(columnNameY)) not in [float, int]:
             raise TypeError
 
-        x = self.getColumn(columnNameX)
-        y = self.getColumn(columnNameY)
-        slope, intercept = stats.linear_regression(x, y)
-        def equation(x): return slope * x + intercept
-        string_equation = f"y={sig.round(slope, sigfigs=3)}x + {sig.round(intercept, sigfigs=3)} (3s.f)"
-        return equation, string_equation
+        running = self._runningStat("pair", columnNameX, columnNameY)
+        if running is not None:
+            return running.fit()
+        key = ("fit", self._columnIndex(columnNameX), self._columnIndex(columnNameY))
+        if key not in self._cache:
+            x = self._numeric(columnNameX)
+            y = self._numeric(columnNameY)
+            if x is None or y is None:
+                x = np.asarray(self.getColumn(columnNameX), dtype=np.float64)
+                y = np.asarray(self.getColumn(columnNameY), dtype=np.float64)
+            self._cache[key] = kernels.regressionFit(x, y)
+        return dict(self._cache[key])
 
     def stdev(self, columnName) -> float:
         """
@@ -155,23 +304,79 @@ class Mixin():
         """
         if self.getColumnType(columnName) not in [float, int]:
             raise ValueError
-        column = self.getColumn(columnName)
-        return stats.stdev(column)
+        running = self._runningStat("stats", columnName)
+        if running is not None:
+            return running.stdev()
+        array = self._numeric(columnName)
+        if array is not None:
+            return kernels.stdev(array)
+        return stats.stdev(self.getColumn(columnName))
 
     def pmcc(self, columnNameX: str = None, columnNameY: str = None) -> float:
         """
         Returns the pmcc value for the columns.
         """
-        if len(self.columns) == 2 and (columnNameX and columnNameY) == None:
+        if len(self.columnNames) == 2 and (columnNameX and columnNameY) == None:
             columnNameX = self.columnNames[0]
             columnNameY = self.columnNames[1]
         if (self.getColumnType(columnNameX) and self.getColumnType(columnNameY)) not in [float, int]:
             raise TypeError
-        x = self.getColumn(columnNameX)
-        y = self.getColumn(columnNameY)
-        return stats.correlation(x, y)
+        running = self._runningStat("pair", columnNameX, columnNameY)
+        if running is not None:
+            return running.correlation()
+        x = self._numeric(columnNameX)
+        y = self._numeric(columnNameY)
+        if x is not None and y is not None:
+            return kernels.correlation(x, y)
+        return stats.correlation(self.getColumn(columnNameX), self.getColumn(columnNameY))
+
+    def correlationMatrix(self, columnNames: list = None):
+        """
+        Returns the pmcc of every pair of columnNames (all numerical columns by default) as a subdivision.
+        Its first column, "column", holds the row names. The other columns are named after columnNames.
+        Every pmcc comes from a single matrix product. Clean the columns first, NaN gives NaN.
+        """
+        columnNames, data = self._numericMatrix(columnNames)
+        r = kernels.correlationMatrix(data)
+        return self._new([np.array(columnNames, dtype=object)] + list(r), ["column"] + columnNames)
 
-    def hypothesis_test(self, columnNameX: str = None, columnNameY: str = None, test_type: str = "two-tailed", value_table: bool = True, sig_level: float = 0.05) -> Optional[Tuple[float, float]]:
+    def hypothesisTestAll(self, columnNames: list = None, test_type: str = "two-tailed", sig_level: float = 0.05, correction: str = None):
+        """
+        Tests every pair of columnNames (all numerical columns by default) for linear correlation, like
+        hypothesis_test with value_table=False, and returns the results as a subdivision instead of printing them.
+        Its columns are "x", "y", "n", "pmcc", "p", "adjusted_p" and "reject".
+
+        correction adjusts the p-values for the number of tests: None, "bonferroni", "holm" or "fdr_bh".
+        reject is True when adjusted_p is below sig_level.
+        """
+        alternative = {"two-tailed": "two-sided", "positive": "greater", "negative": "less"}.get(test_type)
+        if alternative == None:
+            raise ValueError("Invalid test type")
+        columnNames, data = self._numericMatrix(columnNames)
+        r = kernels.correlationMatrix(data)
+        first, second = np.triu_indices(len(columnNames), k=1)
+        pmccs = r[first, second]
+        n = data.shape[0]
+        p = kernels.correlationPValues(pmccs, n, alternative)
+        adjusted = kernels.adjustPValues(p, correction)
+        names = np.array(columnNames, dtype=object)
+        columns = [names[first], names[second], np.full(len(pmccs), n), pmccs, p, adjusted, adjusted < sig_level]
+        return self._new(columns, ["x", "y", "n", "pmcc", "p", "adjusted_p", "reject"])
+
+    def _numericMatrix(self, columnNames: list = None) -> tuple:
+        """The numeric columns side by side in one float64 array, and their names."""
+        if columnNames == None:
+            columnNames = [name for name, kind in zip(self.columnNames, self.columnTypes) if kind in [float, int]]
+        columnNames = list(columnNames)
+        arrays = []
+        for columnName in columnNames:
+            array = self._numeric(columnName)
+            if array is None:
+                raise TypeError(f"{columnName} is not a numerical column")
+            arrays.append(array)
+        return columnNames, np.column_stack(arrays).astype(np.float64, copy=False)
+
+    def hypothesis_test(self, columnNameX: str = None, columnNameY: str = None, test_type: str = "two-tailed", value_table: bool = True, sig_level: float = 0.05, verbose: bool = True) -> HypothesisResult:
         """
         Tests the hypothesis that columnNameX and columnNameY have no linear correlation, at the specified significance level.
 
@@ -183,106 +388,122 @@ class Mixin():
         There is an option to interpolate between pre-calculated critical PMCC values that is on by default.
         Setting value_table to False disables it and is the better method.
         Interpolating is only useful because it can be marked. 
+        A two-tailed test uses the one tailed critical value at sig_level/2.
+        When n or that level are not in the table, the exact critical value from the t distribution is used.
 
-        If value_table is False, the PMCC and p-value will be returned. 
-        """
-
-        def import_criticals():
-            with open(r"Shortcourse/resources/pearson_values.csv", "r") as criticals:
-                n_values = {}
-                for index, value in enumerate(criticals):
-                    if index == 0:
-                        continue
-                    splits = value.split(",")
-                    splits = [float(i.strip()) for i in splits]
-                    n = int(splits.pop())
-                    n_values[n] = splits
-                return n_values
-
-        def print_test(pmcc):
-            print("***************************")
-            print(f"Hypothesis test of {columnNameX} and {columnNameY}:")
-            print(f"N:{n}")
-            print(f"PMCC:{pmcc}")
-            print("H0: r = 0")
-            if pmcc > 0:
-                print("H1: r > 0")
-            else:
-                print("H1: r < 0")
-
-        def interpolate(criticals, n, index):
-            digit1 = n // 10
-
-            low_n = digit1 * 10
-            high_n = digit1 * 10 + 10
-
-            low_c = criticals[low_n][index]
-            high_c = criticals[high_n][index]
-
-            cvalue = ((n-low_n) * (high_c-low_c)/(high_n-low_n)) + low_c
-            cvalue = sig.round(cvalue, sigfigs=3)
-            return cvalue
-
+        Returns a HypothesisResult with the PMCC, p-value, critical value and decision, which unpacks as (pmcc, p).
+        The write up is printed unless verbose is False.
+        """
         match test_type:
             case "two-tailed":
-                test_type = "two-sided"
+                alternative = "two-sided"
             case "positive":
-                test_type = "greater"
+                alternative = "greater"
             case "negative":
-                test_type = "less"
+                alternative = "less"
             case _:
-                ValueError("Invalid test type")
+                raise ValueError("Invalid test type")
 
-        if len(self.columns) == 2 and (columnNameX and columnNameY) == None:
+        if len(self.columnNames) == 2 and (columnNameX and columnNameY) == None:
             columnNameX = self.columnNames[0]
             columnNameY = self.columnNames[1]
 
         if (self.getColumnType(columnNameX) and self.getColumnType(columnNameY)) not in [float, int]:
             raise TypeError
 
-        x = self.getColumn(columnNameX)
-        y = self.getColumn(columnNameY)
+        x = self._numeric(columnNameX)
+        y = self._numeric(columnNameY)
+        if x is None or y is None:
+            x = self.getColumn(columnNameX)
+            y = self.getColumn(columnNameY)
 
-        pmcc, pvalue = pearsonr(x, y, alternative=test_type)
-        pmcc = sig.round(pmcc, sigfigs=3)
+        pmcc, pvalue = pearsonr(x, y, alternative=alternative)
+        pmcc = kernels.roundSigfigs(pmcc, 3)
 
         n = len(x)
 
-        if not value_table: # Returns PMCC and p-value if not in interpolation mode.
-            print_test(pmcc)
-            print(f"P ={pvalue}")
-            if pvalue > sig_level:
-                print("Accept H0")
-            else:
-                print("Reject H0")
-                print("***************************")
-            return pmcc, pvalue
-
-        if (test_type not in ["greater", "less"]) or (sig_level not in [0.1, 0.05, 0.025, 0.01, 0.005]):
-            ValueError(
-                f"Only one tailed tests supported in table mode with only these sig levels: 0.1, 0.05, 0.025, 0.01, 0.005")
-
-        value_index = [0.1, 0.05, 0.025, 0.01, 0.005].index(sig_level)
-        criticals = import_criticals()
-        if n < 4 or n > 100:
-            ValueError(f"The n value: {n} is outside the table range")
-        if n in criticals:
-            critical_value = sig.round(
-                criticals[n][value_index], sigfigs=3, warn=False)
-            interpolated = False
+        if not value_table:
+            result = HypothesisResult(columnNameX, columnNameY, test_type, n, pmcc, pvalue, sig_level, value_table=False)
         else:
-            critical_value = interpolate(criticals, n, value_index)
-            interpolated = True
+            tail = sig_level / 2 if test_type == "two-tailed" else sig_level  # The critical values are one tailed
+            if TABLE_MIN_N <= n <= TABLE_MAX_N and tail in SIG_LEVELS:
+                critical_value, interpolated = tableCritical(n, tail)
+            else:  # Outside the table, so the exact value is used
+                critical_value, interpolated = exactCritical(n, tail), False
+            critical_value = kernels.roundSigfigs(critical_value, 3)
+            result = HypothesisResult(columnNameX, columnNameY, test_type, n, pmcc, pvalue, sig_level,
+                                      value_table=True, critical_value=critical_value, interpolated=interpolated)
+
+        if verbose:
+            print(result.report())
+        return result
+
+    def bootstrap(self, columnNameX: str = None, columnNameY: str = None, statistic: str = "pmcc", resamples: int = 10000,
+                  level: float = 0.95, seed: int = None, workers: int = 1, verbose: bool = True) -> BootstrapResult:
+        """
+        Bootstrap confidence interval of a statistic, for data that does not suit the parametric test (e.g. skewed).
+        statistic is "mean" (of columnNameX), "pmcc" or "slope" (of the regression of columnNameY on columnNameX).
 
-        print_test(pmcc)
-        if interpolated:
-            print(f"INTERPOLATED Critical value: {critical_value}")
-        else:
-            print(f"Critical value: {critical_value}")
-        if abs(pmcc) > critical_value:
-            print(f"{abs(pmcc)} > {critical_value}")
-            print("Reject H0. There is correlation")
-        else:
-            print(f"{abs(pmcc)} < {critical_value}")
-            print("Accept H0. No correlation")
-        print("***************************")
\ No newline at end of file
+        All resamples are drawn as index matrices and computed in batches of array operations (see resampling).
+        seed makes the run repeatable, with any number of workers. workers above 1 shares the batches over
+        that many processes (None for all CPUs).
+
+        Returns a BootstrapResult, which unpacks as (low, high). The write up is printed unless verbose is False.
+        """
+        if len(self.columnNames) <= 2 and (columnNameX == None and columnNameY == None):
+            columnNameX = self.columnNames[0]
+            if statistic != "mean":
+                columnNameY = self.columnNames[1]
+        if statistic == "mean":
+            columnNameY = None
+
+        x = self._numeric(columnNameX)
+        y = None if columnNameY == None else self._numeric(columnNameY)
+        if x is None or (columnNameY != None and y is None):
+            raise TypeError
+
+        match statistic:
+            case "mean":
+                estimate = self.mean(columnNameX)
+            case "pmcc":
+                estimate = self.pmcc(columnNameX, columnNameY)
+            case "slope":
+                estimate = self.regressionFit(columnNameX, columnNameY)["slope"]
+            case _:
+                raise ValueError(f"statistic must be one of {resampling.STATISTICS}")
+        distribution = resampling.bootstrapDistribution(statistic, x, y, resamples, seed, workers)
+        low, high = resampling.percentileInterval(distribution, level)
+        result = BootstrapResult(statistic, columnNameX, columnNameY, len(x), estimate, low, high, level, distribution)
+        if verbose:
+            print(result.report())
+        return result
+
+    def permutation_test(self, columnNameX: str = None, columnNameY: str = None, test_type: str = "two-tailed", sig_level: float = 0.05,
+                         resamples: int = 10000, seed: int = None, workers: int = 1, verbose: bool = True) -> PermutationResult:
+        """
+        Tests the hypothesis that columnNameX and columnNameY have no linear correlation without assuming
+        normal data: the p-value is the share of random pairings of the columns with a PMCC at least as extreme.
+        test_type is "two-tailed", "positive" or "negative" as in hypothesis_test. seed and workers as in bootstrap.
+
+        Returns a PermutationResult, which unpacks as (pmcc, p). The write up is printed unless verbose is False.
+        """
+        alternative = {"two-tailed": "two-sided", "positive": "greater", "negative": "less"}.get(test_type)
+        if alternative == None:
+            raise ValueError("Invalid test type")
+
+        if len(self.columnNames) == 2 and (columnNameX == None and columnNameY == None):
+            columnNameX = self.columnNames[0]
+            columnNameY = self.columnNames[1]
+
+        x = self._numeric(columnNameX)
+        y = self._numeric(columnNameY)
+        if x is None or y is None:
+            raise TypeError
+
+        pmcc = kernels.correlation(x, y)
+        distribution = resampling.permutationDistribution(x, y, resamples, seed, workers)
+        p = resampling.permutationPValue(pmcc, distribution, alternative)
+        result = PermutationResult(columnNameX, columnNameY, test_type, len(x), kernels.roundSigfigs(pmcc, 3), p, sig_level, distribution)
+        if verbose:
+            print(result.report())
+        return result
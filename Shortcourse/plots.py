@@ -1,38 +1,78 @@
-from Shortcourse.core_subdivision import Subdivision, matrixFromColumns
+from Shortcourse.core_subdivision import Subdivision
+from Shortcourse.results import OutlierResult
+from Shortcourse import kernels
 
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import LogNorm
 from matplotlib.figure import Figure
 from typing import Callable
 
+DENSITY_THRESHOLD = 50000  # plot_scatter bins the points of larger tables
+
 class ScatterResult(Subdivision):
     def __init__(self, start_matrix: list, columnNames: list, fig: Figure, ax: Axes):
         super().__init__(start_matrix, columnNames)
         self.ax = ax
         self.fig = fig
 
-    def saveScatter(self, outpath: str = None) -> None:
+    def saveScatter(self, outpath: str = None, close: bool = False) -> None:
+        """Saves the figure. With close, the figure is released afterwards (see close)."""
         x = self.ax.get_xlabel()
         y = self.ax.get_ylabel()
         if outpath == None:
             outpath = f"./scatter_{y} on {x}"
         self.fig.savefig(outpath)
         print(f"Image saved to: {outpath}")
+        if close:
+            self.close()
+
+    def close(self) -> None:
+        """Releases the figure. pyplot keeps every figure it made until it is closed."""
+        _closeFigure(self.fig)
 
-    def addRegression(self, equation: Callable = None, string_equation: str = None, plot_equation=True, font_size: int = 12) -> None:
+    def addRegression(self, equation: Callable = None, string_equation: str = None, plot_equation=True, font_size: int = 12,
+                      band: float = None, prediction: bool = False, band_alpha: float = 0.2) -> None:
+        """
+        Draws the regression line (or the straight line of equation) across the range of x.
+        band is a confidence level such as 0.95 to shade the confidence band of the fitted line, or of a
+        single new observation with prediction. The fitted line and the band come from the subdivision's cached fit.
+        """
+        fit = None
+        if equation == None or band != None:
+            fit = self.regressionFit(self.columnNames[0], self.columnNames[1])
         if equation == None:
             equation, string_equation = self.regression()
         else:
             if plot_equation and string_equation == None:
                 # Equation plot requested, but unable because string not provided with equation.
                 raise ValueError
-        model = list(map(equation, self.columns[0]))
-        self.ax.plot(self.columns[0], model, label=string_equation)
-        plt.legend(fontsize=font_size)
+        if fit != None:
+            xmin, xmax = fit["xmin"], fit["xmax"]
+        else:  # Only the range of x is needed to draw the given equation
+            x = self._numeric(self.columnNames[0])
+            x = np.asarray(self.getColumn(self.columnNames[0]) if x is None else x, dtype=np.float64)
+            xmin, xmax = np.nanmin(x), np.nanmax(x)
+        ends = np.array([xmin, xmax])  # A straight line only needs its two ends
+        self.ax.plot(ends, [equation(ends[0]), equation(ends[1])], label=string_equation)
+        if band != None:
+            x = np.linspace(xmin, xmax, 100)
+            lower, upper = kernels.confidenceBand(fit, x, band, prediction)
+            kind = "prediction" if prediction else "confidence"
+            self.ax.fill_between(x, lower, upper, alpha=band_alpha, label=f"{band:.0%} {kind} band")
+        self.ax.legend(fontsize=font_size)
 
     def plotMultiOutliers(self, high_c: str = "C1", low_c: str = "C2", low_label: str = "low outlier", high_label: str = "high outlier"):
-        if self.outliers == None:
-            self.remove_outliers(self.columnNames[0], self.columnNames[1])
+        """
+        Marks the outliers found by remove_outliers. If it has not found any yet, they are found
+        (by the 1.5IQR rule) without removing them, so the plotted data is unchanged.
+        """
+        if len(self.outliers) == 0:
+            self.remove_outliers(self.columnNames[0], self.columnNames[1], remove=False)
 
         x_top = [outlier[0] for outlier in self.top_outlier_entries]
         y_top = [outlier[1] for outlier in self.top_outlier_entries]
@@ -65,46 +105,22 @@ class ScatterResult(Subdivision):
                 new = old-value
             self.fig.set_figheight(new)
 
-    def print_outliers(self, columnName: str, parent: Subdivision = None) -> None:
+    def print_outliers(self, columnName: str, parent: Subdivision = None, verbose: bool = True) -> OutlierResult:
+        """
+        Looks up the outliers found by remove_outliers in columnName of parent (self by default).
+        Returns them as an OutlierResult and prints them unless verbose is False.
+        """
         if parent == None:
             parent = self
 
-        line = "*" * 30
-        try:
-            index = parent.columnNames.index(columnName)
-        except ValueError:
+        if columnName not in parent.columnNames:
             raise ValueError("This columnName is not in parent")
 
-        print("Outliers:")
-        if len(self.low_x_indices) > 0:
-            print()
-            print("Low X outliers:")
-            for i in self.low_x_indices:
-                print(parent.matrix[i][index], end=", ")
-            print()
-
-        if len(self.high_x_indices) > 0:
-            print()
-            print("High X outliers:")
-            for i in self.high_x_indices:
-                print(parent.matrix[i][index], end=", ")
-            print()
-
-        if len(self.low_y_indices) > 0:
-            print()
-            print("Low Y outliers:")
-            for i in self.low_y_indices:
-                print(parent.matrix[i][index], end=", ")
-            print()
-
-        if len(self.high_y_indices) > 0:
-            print()
-            print("High Y outliers:")
-            for i in self.high_y_indices:
-                print(parent.matrix[i][index], end=", ")
-            print()
-
-        print(line)
+        result = OutlierResult(columnName, parent.getColumn(columnName), self.low_x_indices,
+                               self.high_x_indices, self.low_y_indices, self.high_y_indices)
+        if verbose:
+            print(result.report())
+        return result
 
 class BoxResult(Subdivision):
     def __init__(self, start_matrix: list, columnNames: list, fig: Figure, ax: Axes):
@@ -112,11 +128,18 @@ class BoxResult(Subdivision):
         self.ax = ax
         self.fig = fig
 
-    def save_box(self, outpath: str = None) -> None:
+    def save_box(self, outpath: str = None, close: bool = False) -> None:
+        """Saves the figure. With close, the figure is released afterwards (see close)."""
         if outpath == None:
             outpath = f"./boxplot"
         self.fig.savefig(outpath)
         print(f"Image saved to: {outpath}")
+        if close:
+            self.close()
+
+    def close(self) -> None:
+        """Releases the figure. pyplot keeps every figure it made until it is closed."""
+        _closeFigure(self.fig)
 
     def changesize(self, width=True, smaller=False, value: int = 2):
         if width:
@@ -134,7 +157,24 @@ class BoxResult(Subdivision):
                 new = old-value
             self.fig.set_figheight(new)
 
-def plot_dual_box(subdivision: Subdivision, columnName1: str = None, columnName2: str = None, title: str = None, one_title: str = None, two_title: str = None):
+def _figure(headless: bool) -> tuple:
+    """
+    A new figure and axes. Headless figures are drawn by Agg without going through pyplot, so they are
+    not kept in pyplot's global list of figures and are freed as soon as nothing refers to them.
+    """
+    if not headless:
+        return plt.subplots()
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+
+def _closeFigure(fig: Figure) -> None:
+    plt.close(fig)  # Does nothing for headless figures
+    fig.clear()
+
+
+def plot_dual_box(subdivision: Subdivision, columnName1: str = None, columnName2: str = None, title: str = None, one_title: str = None, two_title: str = None, headless: bool = False):
     # Having 2 Subdivisions as the arguments would be better.
     if len(subdivision.columns) == 2 and (columnName1 == None and columnName2 == None):
         columnName1 = subdivision.columnNames[0]
@@ -151,7 +191,7 @@ def plot_dual_box(subdivision: Subdivision, columnName1: str = None, columnName2
     if title == None:
         title = f"{one_title} with {two_title}"
 
-    fig, ax = plt.subplots()
+    fig, ax = _figure(headless)
 
     ax.boxplot(x=[column1, column2], vert=False, manage_ticks=True)
 
@@ -159,33 +199,123 @@ def plot_dual_box(subdivision: Subdivision, columnName1: str = None, columnName2
     fig.set_figwidth(10)
     ax.set_title(title)
     ax.minorticks_on()
-    new_matrix = matrixFromColumns([column1, column2])
     new_columnNames = [columnName1, columnName2]
-    return BoxResult(new_matrix, new_columnNames, fig, ax)
+    result = BoxResult([], new_columnNames, fig, ax)
+    result.columns = [subdivision._array(columnName1), subdivision._array(columnName2)]
+    return result
  
-def plot_scatter(subdivision: Subdivision, columnNameX: str = None, columnNameY: str = None, title: str = "scatter", xTitle: str = None, yTitle: str = None):
-    if len(subdivision.columns) == 2 and (columnNameX == None and columnNameY == None):
+def plot_scatter(subdivision: Subdivision, columnNameX: str = None, columnNameY: str = None, title: str = "scatter", xTitle: str = None, yTitle: str = None, headless: bool = False,
+                 density_threshold: int = DENSITY_THRESHOLD, density: str = "hexbin", gridsize: int = 100):
+    """
+    Plots columnNameY against columnNameX.
+    Above density_threshold points (None for never), the points are binned instead of drawn one by one, so the
+    drawing time and file size do not grow with the table. density is "hexbin" or "hist2d", gridsize the number
+    of bins along x. Regression lines and outliers can still be added on top.
+    """
+    if len(subdivision.columnNames) == 2 and (columnNameX == None and columnNameY == None):
         columnNameX = subdivision.columnNames[0]
         columnNameY = subdivision.columnNames[1]
 
     if (subdivision.getColumnType(columnNameX) and subdivision.getColumnType(columnNameY)) not in [float, int]:
         raise TypeError
+    if density not in ["hexbin", "hist2d"]:
+        raise ValueError("density must be 'hexbin' or 'hist2d'")
 
     if xTitle == None:
         xTitle = columnNameX
     if yTitle == None:
         yTitle = columnNameY
 
-    x = subdivision.getColumn(columnNameX)
-    y = subdivision.getColumn(columnNameY)
+    x = subdivision._array(columnNameX)
+    y = subdivision._array(columnNameY)
 
-    fig, ax = plt.subplots()
-    ax.scatter(x, y)
+    fig, ax = _figure(headless)
+    if density_threshold != None and len(x) > density_threshold:
+        _plotDensity(fig, ax, x, y, density, gridsize)
+    else:
+        ax.scatter(x, y)
     ax.grid(True)
     ax.set_title(title)
     ax.set_xlabel(xTitle)
     ax.set_ylabel(yTitle)
     ax.minorticks_on()
     new_columnNames = [columnNameX, columnNameY]
-    new_matrix = matrixFromColumns([x, y])
-    return ScatterResult(new_matrix, new_columnNames, fig, ax)
\ No newline at end of file
+    result = ScatterResult([], new_columnNames, fig, ax)
+    result.columns = [x, y]
+    return result
+
+
+def _plotDensity(fig: Figure, ax: Axes, x: np.ndarray, y: np.ndarray, density: str, gridsize: int) -> None:
+    """Draws the number of points in each bin, on a log colour scale, below anything plotted later."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    finite = np.isfinite(x) & np.isfinite(y)
+    x = x[finite]
+    y = y[finite]
+    if density == "hexbin":
+        image = ax.hexbin(x, y, gridsize=gridsize, bins="log", mincnt=1, cmap="viridis", zorder=0)
+    else:
+        counts, xedges, yedges = np.histogram2d(x, y, bins=[gridsize, max(1, gridsize // 2)])
+        counts = np.ma.masked_equal(counts, 0)
+        image = ax.pcolormesh(xedges, yedges, counts.T, norm=LogNorm(), cmap="viridis", zorder=0)
+    fig.colorbar(image, ax=ax, label="entries")
+
+def renderFigures(jobs: list, workers: int = None) -> list:
+    """
+    Renders many figures straight to files, in parallel worker processes, and returns their paths in order.
+    Every figure is headless and released once saved, so long batches do not build up memory.
+
+    Each job is a dictionary:
+    - "kind" -> "scatter" or "box".
+    - "subdivision" -> the data. Only the plotted columns are sent to the workers.
+    - "outpath" -> where to save the image.
+    - "options" -> keyword arguments of plot_scatter / plot_dual_box (column names, titles), optional.
+    - "regression" -> True to add the regression line to a scatter, optional.
+    - "size" -> (width, height) of the figure in inches, optional.
+    - "tight" -> True to apply tight_layout, optional.
+
+    workers is the number of processes (all CPUs by default). 1 renders everything in this process.
+    """
+    jobs = [_jobData(job) for job in jobs]
+    if workers == None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    if workers <= 1:
+        return [_render(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_render, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+
+def _jobData(job: dict) -> dict:
+    """The job with its subdivision cut down to the plotted columns, so less is pickled to the workers."""
+    subdivision = job["subdivision"]
+    options = job.get("options", {})
+    if job["kind"] == "scatter":
+        names = [options.get("columnNameX"), options.get("columnNameY")]
+    elif job["kind"] == "box":
+        names = [options.get("columnName1"), options.get("columnName2")]
+    else:
+        raise ValueError(f"Unknown kind of figure: {job['kind']}")
+    if names == [None, None]:
+        names = subdivision.columnNames[:2]
+    job = dict(job)
+    job["subdivision"] = subdivision._new([subdivision._array(name) for name in names], list(names))
+    return job
+
+
+def _render(job: dict) -> str:
+    options = dict(job.get("options", {}))
+    options["headless"] = True
+    if job["kind"] == "scatter":
+        result = plot_scatter(job["subdivision"], **options)
+        if job.get("regression", False):
+            result.addRegression()
+    else:
+        result = plot_dual_box(job["subdivision"], **options)
+    if job.get("size") != None:
+        result.fig.set_size_inches(*job["size"])
+    if job.get("tight", False):
+        result.fig.tight_layout()
+    result.fig.savefig(job["outpath"])
+    result.close()
+    return job["outpath"]
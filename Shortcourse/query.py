@@ -0,0 +1,251 @@
+import operator
+import numpy as np
+from Shortcourse import kernels
+from Shortcourse.exceptions import ColumnNameError
+"""
+Lazy queries over a subdivision.
+
+A query is a chain of where / select / assign / sort steps. Nothing runs until .collect(), which evaluates
+every step as whole-column numpy operations and returns a new subdivision:
+
+    poor = exp_GDP.query().where(col("gdp_per_capita") < col("gdp_per_capita").median()).collect()
+"""
+
+def _operator(function, symbol: str, swap: bool = False, comparison: bool = False):
+    """Builds an Expression operator method applying function to the evaluated sides."""
+    def method(self, other):
+        other = _expression(other)
+        left, right = (other, self) if swap else (self, other)
+        def evaluate(frame):
+            result = function(left.evaluate(frame), right.evaluate(frame))
+            return np.asarray(result, dtype=bool) if comparison else result
+        return Expression(evaluate, f"({left.text} {symbol} {right.text})", left, right)
+    return method
+
+
+class Expression():
+    """
+    A column calculation that is evaluated over whole arrays when its query is collected.
+    Build them with col() and lit() and the usual operators. Use & | ~ for and / or / not.
+
+    Properties:
+    - .columnNames -> set of the columns the expression reads.
+    - .aggregate -> True if any part of it is an aggregate, such as mean or median.
+    """
+
+    def __init__(self, evaluate, text: str, *parts, columnNames: set = None, aggregate: bool = False) -> None:
+        self._evaluate = evaluate
+        self.text = text
+        self.columnNames = set(columnNames or ()).union(*(part.columnNames for part in parts))
+        self.aggregate = aggregate or any(part.aggregate for part in parts)
+
+    def __repr__(self) -> str:
+        return self.text
+
+    def evaluate(self, frame):
+        """Returns the array (or scalar, for aggregates) of the expression over the frame's columns."""
+        return self._evaluate(frame)
+
+    __lt__ = _operator(operator.lt, "<", comparison=True)
+    __le__ = _operator(operator.le, "<=", comparison=True)
+    __gt__ = _operator(operator.gt, ">", comparison=True)
+    __ge__ = _operator(operator.ge, ">=", comparison=True)
+    __eq__ = _operator(operator.eq, "==", comparison=True)
+    __ne__ = _operator(operator.ne, "!=", comparison=True)
+    __hash__ = None
+    __and__ = _operator(np.logical_and, "&")
+    __or__ = _operator(np.logical_or, "|")
+    __add__ = _operator(operator.add, "+")
+    __radd__ = _operator(operator.add, "+", swap=True)
+    __sub__ = _operator(operator.sub, "-")
+    __rsub__ = _operator(operator.sub, "-", swap=True)
+    __mul__ = _operator(operator.mul, "*")
+    __rmul__ = _operator(operator.mul, "*", swap=True)
+    __truediv__ = _operator(operator.truediv, "/")
+    __rtruediv__ = _operator(operator.truediv, "/", swap=True)
+
+    def __invert__(self):
+        return Expression(lambda frame: np.logical_not(self.evaluate(frame)), f"~{self.text}", self)
+
+    def __neg__(self):
+        return Expression(lambda frame: -self.evaluate(frame), f"-{self.text}", self)
+
+    def isin(self, values: list):
+        """True where the value is one of values."""
+        values = list(values)
+        return Expression(lambda frame: np.isin(self.evaluate(frame), values), f"{self.text}.isin({values})", self)
+
+    def isnan(self):
+        """True where the value is NaN, like clean."""
+        def evaluate(frame):
+            array = np.asarray(self.evaluate(frame))
+            if array.dtype.kind == "f":
+                return np.isnan(array)
+            return np.fromiter((str(cell) == "nan" for cell in array), dtype=bool, count=len(array))
+        return Expression(evaluate, f"{self.text}.isnan()", self)
+
+    # Aggregates give one value, computed over the entries that are left when the step using them runs.
+    def mean(self):
+        return Expression(lambda frame: kernels.mean(self.evaluate(frame)), f"{self.text}.mean()", self, aggregate=True)
+
+    def median(self):
+        return self.quartile(2)
+
+    def quartile(self, q: int = 1):
+        """Quartile q, by the same method as quartileValue."""
+        return Expression(lambda frame: kernels.quantiles(self.evaluate(frame))[q-1], f"{self.text}.quartile({q})", self, aggregate=True)
+
+
+def col(columnName: str) -> Expression:
+    """Refers to a column in a query."""
+    return Expression(lambda frame: frame[columnName], f"col({columnName!r})", columnNames={columnName})
+
+
+def lit(value) -> Expression:
+    """A constant in a query."""
+    return Expression(lambda frame: value, repr(value))
+
+
+def _expression(value) -> Expression:
+    if isinstance(value, Expression):
+        return value
+    return lit(value)
+
+
+class Query():
+    """
+    A lazy chain of steps over a subdivision, started with Subdivision.query().
+    Every step returns a new Query, so a query can be branched and reused.
+
+    When collected, consecutive where steps are combined into one mask (unless a later one has an aggregate,
+    which must see only the entries the earlier ones kept), only the columns that are used are read, and the
+    parent's data is shared with the result when no columns were assigned.
+    Steps can only use the columns the query has at that point: a column left out by select is gone.
+    """
+
+    def __init__(self, subdivision, steps: tuple = (), columnNames: list = None) -> None:
+        self.subdivision = subdivision
+        self._steps = steps
+        self.columnNames = list(subdivision.columnNames) if columnNames == None else columnNames
+
+    def __repr__(self) -> str:
+        lines = ["Query"]
+        for kind, arguments in self._steps:
+            lines.append(f"  .{kind}({', '.join(repr(argument) for argument in arguments)})")
+        return "\n".join(lines)
+
+    def where(self, predicate: Expression):
+        """Keeps only the entries where predicate is True."""
+        predicate = _expression(predicate)
+        self._check(predicate)
+        return self._then("where", (predicate,), self.columnNames)
+
+    def select(self, *columnNames):
+        """Keeps only columnNames, in that order."""
+        for name in columnNames:
+            if name not in self.columnNames:
+                raise ColumnNameError(name, self.columnNames)
+        return self._then("select", columnNames, list(columnNames))
+
+    def assign(self, columnName: str, expression: Expression):
+        """Adds (or replaces) a column calculated from the expression."""
+        expression = _expression(expression)
+        self._check(expression)
+        names = self.columnNames if columnName in self.columnNames else self.columnNames + [columnName]
+        return self._then("assign", (columnName, expression), names)
+
+    def sort(self, columnName, reverse: bool = False):
+        """Sorts the entries like sortEntryValue. columnName and reverse can be lists for several keys."""
+        names = list(columnName) if isinstance(columnName, (list, tuple)) else [columnName]
+        reverses = list(reverse) if isinstance(reverse, (list, tuple)) else [reverse] * len(names)
+        for name in names:
+            if name not in self.columnNames:
+                raise ColumnNameError(name, self.columnNames)
+        return self._then("sort", (names, reverses), self.columnNames)
+
+    def collect(self):
+        """Runs the query and returns the result as a new subdivision."""
+        frame = _Frame(self.subdivision)
+        steps = list(self._steps)
+        filtered = False
+        sorted_by = self.subdivision.metadata["sorted"]  # where and select keep the order of the entries
+        while len(steps) > 0:
+            kind, arguments = steps.pop(0)
+            if kind == "where":
+                mask = arguments[0].evaluate(frame)
+                # Fuse the following filters into the same mask. An aggregate needs the entries kept so far, so stops it.
+                while len(steps) > 0 and steps[0][0] == "where" and not steps[0][1][0].aggregate:
+                    mask = np.logical_and(mask, steps.pop(0)[1][0].evaluate(frame))
+                frame.take(np.flatnonzero(np.broadcast_to(mask, frame.rowCount())))
+                filtered = True
+            elif kind == "assign":
+                columnName, expression = arguments
+                value = expression.evaluate(frame)
+                if np.ndim(value) == 0:
+                    value = np.full(frame.rowCount(), value)
+                frame.derived[columnName] = np.asarray(value)
+                frame.arrays.pop(columnName, None)
+                if sorted_by and columnName in [name for name, reverse in sorted_by]:
+                    sorted_by = False  # The new values of a sort key are not in order
+            elif kind == "sort":
+                names, reverses = arguments
+                keys = []  # As in sortEntryValue: descending keys sort by a NaN flag first, so NaN stays last
+                for name, reverse in zip(names, reverses):
+                    keys += [col(name).isnan().evaluate(frame), -kernels.rank(frame[name])] if reverse else [kernels.rank(frame[name])]
+                frame.take(np.lexsort(keys[::-1]))
+                sorted_by = list(zip(names, reverses))
+            elif kind == "select":
+                frame.derived = {name: array for name, array in frame.derived.items() if name in arguments}
+
+        result = frame.result(self.columnNames)
+        result.metadata.update(self.subdivision.metadata)
+        if result.metadata["clean"] and any(result._missing(index).any() for index, name in enumerate(result.columnNames) if name in frame.derived):
+            result.metadata["clean"] = False  # An assigned column brought NaN in
+        result.metadata["filtered"] = filtered or self.subdivision.metadata["filtered"]
+        if sorted_by and any(name not in self.columnNames for name, reverse in sorted_by):
+            sorted_by = False  # A sort key was left out by select
+        result.metadata["sorted"] = sorted_by
+        return result
+
+    def _check(self, expression: Expression) -> None:
+        """Raises ColumnNameError if the expression reads a column this query does not have."""
+        for name in sorted(expression.columnNames):
+            if name not in self.columnNames:
+                raise ColumnNameError(name, self.columnNames)
+
+    def _then(self, kind: str, arguments: tuple, columnNames: list):
+        return Query(self.subdivision, self._steps + ((kind, arguments),), columnNames)
+
+
+class _Frame():
+    """The state of a query while it runs: which parent entries are left, and the assigned columns."""
+
+    def __init__(self, subdivision) -> None:
+        self.subdivision = subdivision
+        self.rows = None  # Indexes into the parent's entries. None is all of them.
+        self.arrays = {}  # Parent columns gathered at the current rows
+        self.derived = {}  # Assigned columns, already at the current rows
+
+    def __getitem__(self, columnName: str) -> np.ndarray:
+        if columnName in self.derived:
+            return self.derived[columnName]
+        if columnName not in self.arrays:
+            array = self.subdivision._array(columnName)
+            self.arrays[columnName] = array if self.rows is None else array[self.rows]
+        return self.arrays[columnName]
+
+    def rowCount(self) -> int:
+        if self.rows is not None:
+            return len(self.rows)
+        return self.subdivision._rowCount()
+
+    def take(self, indexes: np.ndarray) -> None:
+        self.rows = indexes if self.rows is None else self.rows[indexes]
+        self.arrays = {name: array[indexes] for name, array in self.arrays.items()}
+        self.derived = {name: array[indexes] for name, array in self.derived.items()}
+
+    def result(self, columnNames: list):
+        """The query's result. It shares the parent's data unless there are assigned columns."""
+        if len(self.derived) == 0:
+            return self.subdivision._view(rows=self.rows, columnNames=list(columnNames))
+        return self.subdivision._new([self[name] for name in columnNames], list(columnNames))
@@ -0,0 +1,128 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+"""
+Bootstrap and permutation resampling, done in batches of whole index matrices.
+
+Every batch draws one (resamples x n) matrix of indexes and computes the statistic of all its resamples with
+a few array reductions, instead of one resample at a time in python. Batches are sized to keep memory bounded,
+each has its own random stream spawned from the seed, so a seeded run gives the same result with any number of workers.
+"""
+
+STATISTICS = ["mean", "pmcc", "slope"]
+BATCH_ELEMENTS = 1 << 22  # Indexes drawn per batch: about 4M, i.e. tens of MB of temporary arrays
+
+
+def bootstrapDistribution(statistic: str, x: np.ndarray, y: np.ndarray = None, resamples: int = 10000,
+                          seed: int = None, workers: int = 1) -> np.ndarray:
+    """
+    The statistic ("mean" of x, "pmcc" or regression "slope" of y on x) of every bootstrap resample:
+    n entries drawn from the n entries (pairs) with replacement.
+    """
+    if statistic not in STATISTICS:
+        raise ValueError(f"statistic must be one of {STATISTICS}")
+    if statistic != "mean" and y is None:
+        raise ValueError(f"{statistic} needs a y column")
+    return _run("bootstrap", statistic, x, y, resamples, seed, workers)
+
+
+def permutationDistribution(x: np.ndarray, y: np.ndarray, resamples: int = 10000, seed: int = None, workers: int = 1) -> np.ndarray:
+    """The pmcc of x with a random permutation of y, for every resample: its distribution when there is no correlation."""
+    return _run("permutation", "pmcc", x, y, resamples, seed, workers)
+
+
+def percentileInterval(distribution: np.ndarray, level: float = 0.95) -> tuple:
+    """The central level interval of the resampled statistics. Resamples where it is undefined (NaN) are left out."""
+    tail = (1 - level) / 2
+    low, high = np.nanquantile(distribution, [tail, 1 - tail])
+    return float(low), float(high)
+
+
+def permutationPValue(observed: float, distribution: np.ndarray, alternative: str = "two-sided") -> float:
+    """
+    Share of the permuted statistics at least as extreme as the observed one. The observed arrangement counts
+    as one of the permutations, so the p-value is never 0.
+    """
+    match alternative:
+        case "two-sided":
+            extreme = np.abs(distribution) >= abs(observed)
+        case "greater":
+            extreme = distribution >= observed
+        case "less":
+            extreme = distribution <= observed
+        case _:
+            raise ValueError("alternative must be 'two-sided', 'greater' or 'less'")
+    return float((np.count_nonzero(extreme) + 1) / (len(distribution) + 1))
+
+
+def _run(kind: str, statistic: str, x: np.ndarray, y: np.ndarray, resamples: int, seed: int, workers: int) -> np.ndarray:
+    """Splits the resamples into batches, each with its own random stream, and runs them here or in a process pool."""
+    x = _prepare(x)
+    y = None if y is None else _prepare(y)
+    if y is not None and len(y) != len(x):
+        raise ValueError("both columns must have the same number of entries")
+    if len(x) < 2:
+        raise ValueError("at least two entries are needed to resample")
+    perBatch = max(1, BATCH_ELEMENTS // len(x))
+    sizes = [min(perBatch, resamples - start) for start in range(0, resamples, perBatch)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(kind, statistic, size, child) for size, child in zip(sizes, seeds)]
+
+    if workers == None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+    if workers <= 1:
+        _setData(x, y)
+        try:
+            return np.concatenate([_batch(task) for task in tasks])
+        finally:
+            _setData(None, None)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_setData, initargs=(x, y)) as pool:
+        return np.concatenate(list(pool.map(_batch, tasks)))
+
+
+def _prepare(values: np.ndarray) -> np.ndarray:
+    """The column as a float64 array."""
+    return np.asarray(values, dtype=np.float64)
+
+
+_x = None  # The columns the batches in this process resample
+_y = None
+
+
+def _setData(x: np.ndarray, y: np.ndarray) -> None:
+    global _x, _y
+    _x, _y = x, y
+
+
+def _batch(task: tuple) -> np.ndarray:
+    kind, statistic, size, seed = task
+    rng = np.random.default_rng(seed)
+    x, y = _x, _y
+    n = len(x)
+    dtype = np.int32 if n < 2**31 else np.int64
+
+    if kind == "permutation":
+        xc = x - x.mean()
+        yc = y - y.mean()
+        order = np.tile(np.arange(n, dtype=dtype), (size, 1))
+        rng.permuted(order, axis=1, out=order)  # Every row shuffled on its own
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (yc[order] @ xc) / np.sqrt(np.dot(xc, xc) * np.dot(yc, yc))
+
+    indexes = rng.integers(0, n, size=(size, n), dtype=dtype)
+    if statistic == "mean":
+        return x[indexes].mean(axis=1)
+
+    # The sums below are of values centred on the whole column's means, so their differences do not lose precision
+    xs = (x - x.mean())[indexes]
+    ys = (y - y.mean())[indexes]
+    sx = xs.sum(axis=1)
+    sy = ys.sum(axis=1)
+    sxx = np.einsum("ij,ij->i", xs, xs) - sx * sx / n
+    sxy = np.einsum("ij,ij->i", xs, ys) - sx * sy / n
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if statistic == "slope":
+            return sxy / sxx
+        syy = np.einsum("ij,ij->i", ys, ys) - sy * sy / n
+        return sxy / np.sqrt(sxx * syy)
@@ -0,0 +1,240 @@
+import numpy as np
+"""
+Result records returned by the tests and outlier methods. They only hold numbers; the report methods
+turn them into the text the library prints, so batch runs can skip printing entirely.
+"""
+
+def _alternative(test_type: str) -> str:
+    """The H1 line of a test of no correlation."""
+    match test_type:
+        case "positive":
+            return "H1: r > 0"
+        case "negative":
+            return "H1: r < 0"
+        case _:
+            return "H1: r != 0"
+
+
+class HypothesisResult():
+    """
+    Outcome of hypothesis_test.
+
+    Properties:
+    - .columnNameX, .columnNameY -> the tested columns.
+    - .test_type -> "two-tailed", "positive" or "negative".
+    - .n -> number of pairs.
+    - .pmcc -> PMCC to 3 significant figures.
+    - .p -> p-value.
+    - .sig_level -> significance level of the test.
+    - .value_table -> True if the decision used a critical value instead of the p-value.
+    - .critical_value -> critical PMCC (3 s.f.) in value_table mode, otherwise None.
+    - .interpolated -> True if critical_value was interpolated from the table.
+    - .reject -> True if H0 (no correlation) is rejected.
+
+    Unpacks as (pmcc, p), so `pmcc, p = subdivision.hypothesis_test(...)` keeps working.
+    """
+
+    def __init__(self, columnNameX: str, columnNameY: str, test_type: str, n: int, pmcc: float, p: float,
+                 sig_level: float, value_table: bool, critical_value: float = None, interpolated: bool = False) -> None:
+        self.columnNameX = columnNameX
+        self.columnNameY = columnNameY
+        self.test_type = test_type
+        self.n = n
+        self.pmcc = pmcc
+        self.p = p
+        self.sig_level = sig_level
+        self.value_table = value_table
+        self.critical_value = critical_value
+        self.interpolated = interpolated
+        if value_table:  # The critical value is one tailed, so the sign of pmcc matters unless the test is two-tailed
+            match test_type:
+                case "positive":
+                    self.reject = bool(pmcc > critical_value)
+                case "negative":
+                    self.reject = bool(pmcc < -critical_value)
+                case _:
+                    self.reject = bool(abs(pmcc) > critical_value)
+        else:
+            self.reject = bool(p <= sig_level)
+
+    def __iter__(self):
+        return iter((self.pmcc, self.p))
+
+    def __repr__(self) -> str:
+        return f"HypothesisResult(n={self.n}, pmcc={self.pmcc}, p={self.p}, critical_value={self.critical_value}, reject={self.reject})"
+
+    def report(self) -> str:
+        """The printed write up of the test."""
+        lines = [
+            "***************************",
+            f"Hypothesis test of {self.columnNameX} and {self.columnNameY}:",
+            f"N:{self.n}",
+            f"PMCC:{self.pmcc}",
+            "H0: r = 0",
+            _alternative(self.test_type),
+        ]
+        if not self.value_table:
+            lines.append(f"P ={self.p}")
+            if self.reject:
+                lines += ["Reject H0", "***************************"]
+            else:
+                lines.append("Accept H0")
+            return "\n".join(lines)
+
+        if self.interpolated:
+            lines.append(f"INTERPOLATED Critical value: {self.critical_value}")
+        else:
+            lines.append(f"Critical value: {self.critical_value}")
+        match self.test_type:
+            case "positive":
+                above, below = f"{self.pmcc} > {self.critical_value}", f"{self.pmcc} < {self.critical_value}"
+            case "negative":
+                above, below = f"{self.pmcc} < {-self.critical_value}", f"{self.pmcc} > {-self.critical_value}"
+            case _:
+                above, below = f"{abs(self.pmcc)} > {self.critical_value}", f"{abs(self.pmcc)} < {self.critical_value}"
+        if self.reject:
+            lines += [above, "Reject H0. There is correlation"]
+        else:
+            lines += [below, "Accept H0. No correlation"]
+        lines.append("***************************")
+        return "\n".join(lines)
+
+
+class OutlierResult():
+    """
+    Outliers found by remove_outliers, looked up in a column of a parent subdivision by print_outliers.
+
+    Properties:
+    - .columnName -> the column the values come from.
+    - .low_x_indices, .high_x_indices, .low_y_indices, .high_y_indices -> entry indexes of each kind of outlier.
+    - .low_x, .high_x, .low_y, .high_y -> the values in columnName at those indexes.
+    """
+
+    def __init__(self, columnName: str, values: list, low_x_indices: list, high_x_indices: list,
+                 low_y_indices: list, high_y_indices: list) -> None:
+        self.columnName = columnName
+        self.low_x_indices = list(low_x_indices)
+        self.high_x_indices = list(high_x_indices)
+        self.low_y_indices = list(low_y_indices)
+        self.high_y_indices = list(high_y_indices)
+        self.low_x = [values[i] for i in self.low_x_indices]
+        self.high_x = [values[i] for i in self.high_x_indices]
+        self.low_y = [values[i] for i in self.low_y_indices]
+        self.high_y = [values[i] for i in self.high_y_indices]
+
+    def __repr__(self) -> str:
+        return f"OutlierResult(low_x={self.low_x}, high_x={self.high_x}, low_y={self.low_y}, high_y={self.high_y})"
+
+    def report(self) -> str:
+        """The printed list of outliers."""
+        text = "Outliers:\n"
+        for title, values in [("Low X outliers:", self.low_x), ("High X outliers:", self.high_x),
+                              ("Low Y outliers:", self.low_y), ("High Y outliers:", self.high_y)]:
+            if len(values) > 0:
+                text += f"\n{title}\n" + "".join(f"{value}, " for value in values) + "\n"
+        return text + "*" * 30
+
+
+class BootstrapResult():
+    """
+    Bootstrap confidence interval from bootstrap.
+
+    Properties:
+    - .statistic -> "mean", "pmcc" or "slope".
+    - .columnNameX, .columnNameY -> the resampled columns (columnNameY is None for the mean).
+    - .n -> number of entries.
+    - .estimate -> the statistic of the data itself.
+    - .low, .high -> ends of the percentile confidence interval.
+    - .level -> confidence level of the interval.
+    - .stderr -> bootstrap standard error (standard deviation of the resampled statistics).
+    - .resamples -> number of resamples.
+    - .distribution -> the statistic of every resample, as an array.
+    """
+
+    def __init__(self, statistic: str, columnNameX: str, columnNameY: str, n: int, estimate: float,
+                 low: float, high: float, level: float, distribution) -> None:
+        self.statistic = statistic
+        self.columnNameX = columnNameX
+        self.columnNameY = columnNameY
+        self.n = n
+        self.estimate = estimate
+        self.low = low
+        self.high = high
+        self.level = level
+        self.distribution = distribution
+        self.resamples = len(distribution)
+        self.stderr = float(np.nanstd(distribution, ddof=1))
+
+    def __iter__(self):
+        return iter((self.low, self.high))
+
+    def __repr__(self) -> str:
+        return f"BootstrapResult({self.statistic}={self.estimate}, low={self.low}, high={self.high}, level={self.level})"
+
+    def report(self) -> str:
+        """The printed write up of the interval."""
+        columns = self.columnNameX if self.columnNameY == None else f"{self.columnNameX} and {self.columnNameY}"
+        return "\n".join([
+            "***************************",
+            f"Bootstrap {self.statistic} of {columns}:",
+            f"N:{self.n}",
+            f"Resamples:{self.resamples}",
+            f"{self.statistic}:{self.estimate}",
+            f"Standard error:{self.stderr}",
+            f"{self.level:.0%} confidence interval: {self.low} to {self.high}",
+            "***************************",
+        ])
+
+
+class PermutationResult():
+    """
+    Outcome of permutation_test.
+
+    Properties:
+    - .columnNameX, .columnNameY -> the tested columns.
+    - .test_type -> "two-tailed", "positive" or "negative".
+    - .n -> number of pairs.
+    - .pmcc -> PMCC of the data.
+    - .p -> permutation p-value.
+    - .sig_level -> significance level of the test.
+    - .reject -> True if H0 (no correlation) is rejected.
+    - .resamples -> number of permutations.
+    - .distribution -> the PMCC of every permutation, as an array.
+
+    Unpacks as (pmcc, p), like HypothesisResult.
+    """
+
+    def __init__(self, columnNameX: str, columnNameY: str, test_type: str, n: int, pmcc: float, p: float,
+                 sig_level: float, distribution) -> None:
+        self.columnNameX = columnNameX
+        self.columnNameY = columnNameY
+        self.test_type = test_type
+        self.n = n
+        self.pmcc = pmcc
+        self.p = p
+        self.sig_level = sig_level
+        self.reject = bool(p <= sig_level)
+        self.distribution = distribution
+        self.resamples = len(distribution)
+
+    def __iter__(self):
+        return iter((self.pmcc, self.p))
+
+    def __repr__(self) -> str:
+        return f"PermutationResult(n={self.n}, pmcc={self.pmcc}, p={self.p}, reject={self.reject})"
+
+    def report(self) -> str:
+        """The printed write up of the test."""
+        lines = [
+            "***************************",
+            f"Permutation test of {self.columnNameX} and {self.columnNameY}:",
+            f"N:{self.n}",
+            f"Permutations:{self.resamples}",
+            f"PMCC:{self.pmcc}",
+            "H0: r = 0",
+            _alternative(self.test_type),
+            f"P ={self.p}",
+        ]
+        lines.append("Reject H0" if self.reject else "Accept H0")
+        lines.append("***************************")
+        return "\n".join(lines)
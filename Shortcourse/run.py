@@ -0,0 +1,208 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from pandas import read_csv, read_excel
+from Shortcourse.core_subdivision import Subdivision, subdivisionFromColumns, subdivisionFromCSV, subdivisionFromExcel, subdivisionFromParquet
+"""
+Runs many hypothesis tests from one spec file, in parallel:
+
+    python -m Shortcourse.run analyses.json --workers 8 --output results.csv
+
+The data is loaded once. Numerical columns are put in shared memory, which the worker processes
+read without copying. Text columns (only needed for filters) are sent to each worker once.
+
+A spec is a JSON object:
+
+    {
+        "source": {"path": "exam/exam_data_2023.xlsx", "sheet": 0},
+        "analyses": [
+            {"name": "asia", "x": "gdp_per_capita", "y": "total_covid_deaths_per_million 2020",
+             "filter": {"continent": "Asia"}, "test_type": "negative"},
+            {"name": "rich", "x": "gdp_per_capita", "y": "life_expectancy",
+             "range": {"gdp_per_capita": [14000, null]}, "test_type": "positive", "value_table": false}
+        ]
+    }
+
+Each analysis takes the hypothesis_test arguments (test_type, value_table, sig_level), an optional "filter"
+of column -> value to keep, and an optional "range" of column -> [low, high] (null for open).
+Entries with NaN in x or y are removed before testing unless "clean" is false.
+"""
+
+RESULT_COLUMNS = ["name", "x", "y", "n", "pmcc", "p", "critical_value", "interpolated", "reject", "error"]
+
+
+def runAnalyses(spec: dict, workers: int = None) -> Subdivision:
+    """
+    Runs every analysis in the spec and returns one result row per analysis, in spec order,
+    as a subdivision with RESULT_COLUMNS. An analysis that fails has its message in "error".
+    workers is the number of processes (all CPUs by default). 1 runs everything in this process.
+    """
+    analyses = spec["analyses"]
+    subdivision = _load(spec["source"], analyses)
+    if workers == None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(analyses))
+
+    if workers <= 1:
+        _useShared(subdivision)
+        rows = [_analyse(analysis) for analysis in analyses]
+    else:
+        blocks, descriptors = _share(subdivision)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(descriptors,)) as pool:
+                chunksize = max(1, len(analyses) // (workers * 4))
+                rows = list(pool.map(_analyse, analyses, chunksize=chunksize))
+        finally:
+            _release(blocks)
+
+    columns = [np.array([row[name] for row in rows], dtype=object) for name in RESULT_COLUMNS]
+    return subdivisionFromColumns(columns, list(RESULT_COLUMNS))
+
+
+def _load(source: dict, analyses: list) -> Subdivision:
+    """Loads the columns the analyses use (or source["columns"]) from the source file."""
+    columnNames = source.get("columns")
+    if columnNames == None:
+        columnNames = []
+        for analysis in analyses:
+            for name in [analysis["x"], analysis["y"], *analysis.get("filter", {}), *analysis.get("range", {})]:
+                if name not in columnNames:
+                    columnNames.append(name)
+    path = source["path"]
+    extension = os.path.splitext(path)[1].lower()
+    header = _header(path, extension, source.get("sheet", 0))
+    if header != None:  # A missing column fails only the analyses that use it, when they look it up
+        columnNames = [name for name in columnNames if name in header]
+    if extension == ".csv":
+        return subdivisionFromCSV(path, columnNames)
+    if extension == ".parquet":
+        return subdivisionFromParquet(path, columnNames)
+    return subdivisionFromExcel(path, columnNames, sheet=source.get("sheet", 0), sidecar=source.get("sidecar", False))
+
+
+def _header(path: str, extension: str, sheet=0) -> list:
+    """The column names in the source file, or None if they can not be read (the loader then reports why)."""
+    try:
+        if extension == ".csv":
+            return list(read_csv(path, nrows=0).columns)
+        if extension == ".parquet":
+            from pyarrow.parquet import read_schema
+            return read_schema(path).names
+        return list(read_excel(path, sheet_name=sheet, nrows=0).columns)
+    except Exception:
+        return None
+
+
+def _share(subdivision: Subdivision) -> tuple:
+    """
+    Copies the numerical columns into shared memory blocks. Returns the blocks and how to find them.
+    If a block can not be made (e.g. /dev/shm is full), the ones already made are unlinked before raising.
+    """
+    blocks = []
+    descriptors = []
+    try:
+        for index, name in enumerate(subdivision.columnNames):
+            dictionary = subdivision._dictionary(index)
+            if dictionary is not None:  # Text is sent as its codes and distinct values
+                descriptors.append((name, None, None, 0, dictionary))
+                continue
+            array = subdivision._array(name)
+            if array.dtype.kind not in "biuf":
+                descriptors.append((name, None, None, 0, array))
+                continue
+            block = SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+            descriptors.append((name, block.name, array.dtype.str, len(array), None))
+    except BaseException:
+        _release(blocks)
+        raise
+    return blocks, descriptors
+
+
+def _release(blocks: list) -> None:
+    """Closes and unlinks shared memory blocks."""
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+_shared = None  # The subdivision the analyses in this process read from
+_blocks = []  # Keeps the worker's shared memory mapped
+
+
+def _attach(descriptors: list) -> None:
+    """Worker initializer: rebuilds the subdivision over the parent's shared memory."""
+    global _blocks
+    columns = []
+    for name, blockName, dtype, length, objects in descriptors:
+        if blockName == None:
+            columns.append(objects)
+            continue
+        block = SharedMemory(name=blockName)  # Workers share the parent's resource tracker, so the parent unlinks it
+        _blocks.append(block)
+        array = np.ndarray((length,), dtype=np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        columns.append(array)
+    _useShared(subdivisionFromColumns(columns, [descriptor[0] for descriptor in descriptors]))
+
+
+def _useShared(subdivision: Subdivision) -> None:
+    global _shared
+    _shared = subdivision
+
+
+def _analyse(analysis: dict) -> dict:
+    """Runs one analysis on the shared subdivision and returns its result row."""
+    x = analysis["x"]
+    y = analysis["y"]
+    row = dict.fromkeys(RESULT_COLUMNS)
+    row.update(name=analysis.get("name", f"{y} on {x}"), x=x, y=y, error="")
+    try:
+        subdivision = _shared
+        for columnName, value in analysis.get("filter", {}).items():
+            subdivision = subdivision.selectByEntry(columnName, value)
+        for columnName, (low, high) in analysis.get("range", {}).items():
+            subdivision = subdivision.selectRange(columnName, low, high)
+        subdivision = subdivision._view(columnNames=[x, y])
+        if analysis.get("clean", True):
+            subdivision.clean([x, y])
+        result = subdivision.hypothesis_test(x, y, test_type=analysis.get("test_type", "two-tailed"),
+                                             value_table=analysis.get("value_table", True),
+                                             sig_level=analysis.get("sig_level", 0.05), verbose=False)
+        row.update(n=result.n, pmcc=float(result.pmcc), p=float(result.p), interpolated=result.interpolated,
+                   critical_value=None if result.critical_value is None else float(result.critical_value),
+                   reject=result.reject)
+    except Exception as error:  # One bad analysis should not stop the batch
+        row["error"] = f"{type(error).__name__}: {error}"
+    return row
+
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m Shortcourse.run", description="Run many hypothesis tests from a JSON spec in parallel.")
+    parser.add_argument("spec", help="path of the JSON spec")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: all CPUs)")
+    parser.add_argument("--output", default=None, help="CSV file for the results (default: standard output)")
+    arguments = parser.parse_args(argv)
+
+    with open(arguments.spec, "r") as file:
+        spec = json.load(file)
+    results = runAnalyses(spec, workers=arguments.workers)
+
+    output = open(arguments.output, "w", newline="") if arguments.output else sys.stdout
+    try:
+        writer = csv.writer(output)
+        writer.writerow(results.columnNames)
+        writer.writerows(results.matrix)
+    finally:
+        if arguments.output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
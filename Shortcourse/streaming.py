@@ -0,0 +1,218 @@
+import numpy as np
+from math import nan, sqrt
+from statistics import StatisticsError
+"""
+Running statistics that are updated with each batch of appended entries instead of being recomputed
+from the whole column. Each one can be merged with another of the same kind, e.g. one per day of data.
+"""
+
+class RunningStats():
+    """
+    Count, mean, M2 (sum of squared deviations from the mean), min and max of a column.
+    Batches are combined with Welford's / Chan's update, so mean and stdev cost O(1) after each batch.
+    While every batch is of integers, total keeps their exact sum (it is None otherwise).
+    """
+
+    def __init__(self, values=None) -> None:
+        self.count = 0
+        self.total = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = nan
+        self.max = nan
+        if values is not None:
+            self.update(values)
+
+    def update(self, values) -> None:
+        """Adds a batch of values."""
+        values = np.asarray(values)
+        if len(values) == 0:
+            return
+        batch = RunningStats()
+        batch.count = len(values)
+        batch.total = int(values.sum()) if values.dtype.kind in "iu" else None
+        values = values.astype(np.float64, copy=False)
+        batch.mean = float(np.mean(values))
+        centred = values - batch.mean
+        batch.m2 = float(np.dot(centred, centred))
+        batch.min = float(np.min(values))
+        batch.max = float(np.max(values))
+        self.merge(batch)
+
+    def merge(self, other) -> None:
+        """Adds the values counted by another RunningStats."""
+        if other.count == 0:
+            return
+        self.total = None if self.total is None or other.total is None else self.total + other.total
+        if self.count == 0:
+            self.count, self.mean, self.m2, self.min, self.max = other.count, other.mean, other.m2, other.min, other.max
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.count = count
+
+    def stdev(self) -> float:
+        """Sample standard deviation."""
+        if self.count < 2:
+            raise StatisticsError("stdev requires at least two data points")
+        return sqrt(self.m2 / (self.count - 1))
+
+
+class RunningPair():
+    """
+    Co-moments of two columns: count, both means, both M2 and the sum of cross products of deviations,
+    plus the range of x. Enough for the pmcc and the regression fit in O(1) after each batch.
+    """
+
+    def __init__(self, x=None, y=None) -> None:
+        self.x = RunningStats()
+        self.y = RunningStats()
+        self.cxy = 0.0
+        if x is not None:
+            self.update(x, y)
+
+    @property
+    def count(self) -> int:
+        return self.x.count
+
+    def update(self, x, y) -> None:
+        """Adds a batch of (x, y) pairs."""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if len(x) != len(y):
+            raise StatisticsError("both inputs must have the same number of data points")
+        if len(x) == 0:
+            return
+        batch = RunningPair()
+        batch.x.update(x)
+        batch.y.update(y)
+        batch.cxy = float(np.dot(x - batch.x.mean, y - batch.y.mean))
+        self.merge(batch)
+
+    def merge(self, other) -> None:
+        """Adds the pairs counted by another RunningPair."""
+        if self.count > 0 and other.count > 0:
+            count = self.count + other.count
+            dx = other.x.mean - self.x.mean
+            dy = other.y.mean - self.y.mean
+            self.cxy += other.cxy + dx * dy * self.count * other.count / count
+        else:
+            self.cxy += other.cxy
+        self.x.merge(other.x)
+        self.y.merge(other.y)
+
+    def correlation(self) -> float:
+        """Pearson's correlation coefficient."""
+        if self.count < 2:
+            raise StatisticsError("at least two data points are required")
+        try:
+            return self.cxy / sqrt(self.x.m2 * self.y.m2)
+        except ZeroDivisionError:
+            raise StatisticsError("at least one of the inputs is constant")
+
+    def fit(self) -> dict:
+        """The least squares fit of y on x, with the same keys as kernels.regressionFit."""
+        n = self.count
+        if n < 2:
+            raise StatisticsError("at least two data points are required")
+        sxx, syy, sxy = self.x.m2, self.y.m2, self.cxy
+        if sxx == 0:
+            raise StatisticsError("x is constant")
+        slope = sxy / sxx
+        sse = max(syy - slope * sxy, 0.0)
+        return {
+            "n": n,
+            "xbar": self.x.mean,
+            "ybar": self.y.mean,
+            "sxx": sxx,
+            "syy": syy,
+            "sxy": sxy,
+            "slope": slope,
+            "intercept": self.y.mean - slope * self.x.mean,
+            "r": sxy / sqrt(sxx * syy) if syy > 0 else nan,
+            "sse": sse,
+            "residual_se": sqrt(sse / (n - 2)) if n > 2 else nan,
+            "xmin": self.x.min,
+            "xmax": self.x.max,
+        }
+
+
+class QuantileSketch():
+    """
+    Mergeable approximate quantiles of a column (a KLL sketch).
+
+    Values are kept in levels. A value at level h stands for 2**h of the original values. When a level holds
+    more than its capacity, it is sorted and every other value (from a random start) moves up a level.
+    If the count is odd, its smallest or largest value (at random) stays behind, so neither end is favoured.
+    This keeps O(k log(n/k)) values. The rank error is about 1/k of the count.
+    Until the first compaction (at most k values) the quantiles are exact.
+    NaN values are not counted.
+    """
+
+    def __init__(self, values=None, k: int = 256, seed: int = 0) -> None:
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+        if values is not None:
+            self.update(values)
+
+    def update(self, values) -> None:
+        """Adds a batch of values."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other) -> None:
+        """Adds the values summarised by another QuantileSketch."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1  # Levels below the top hold geometrically fewer values
+        return max(2, int(self.k * (2/3) ** depth))
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) <= self._capacity(level):
+                level += 1
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(items)
+            kept = items[:0]
+            paired = items
+            if len(items) % 2 == 1:  # An odd value out stays on this level: the smallest or the largest, at random
+                if self._rng.integers(2):
+                    kept, paired = items[:1], items[1:]
+                else:
+                    kept, paired = items[-1:], items[:-1]
+            promoted = paired[self._rng.integers(2)::2]  # Even or odd positions, at random
+            self.levels[level] = kept
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level = 0  # A new top level lowers the capacity of the ones below it
+
+    def quantiles(self, n: int = 4) -> list:
+        """Approximate cut points dividing the values into n groups, by the method of statistics.quantiles."""
+        if self.count < 2:
+            raise StatisticsError("must have at least two data points")
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        values = values[order]
+        weights = weights[order]
+        positions = np.cumsum(weights) - (weights - 1) / 2  # Middle rank (from 1) that each value stands for
+        cuts = np.arange(1, n) * (weights.sum() + 1) / n
+        return np.interp(cuts, positions, values).tolist()
@@ -0,0 +1 @@
+"""Timing scripts for the Shortcourse hot paths. Run them as modules from the repository root."""
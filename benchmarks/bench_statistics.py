@@ -0,0 +1,43 @@
+"""
+Compares the numpy kernels behind the maths Mixin with the statistics module they replace.
+Run from the repository root:
+
+    python -m benchmarks.bench_statistics [rows]
+"""
+import statistics as stats
+import sys
+import timeit
+
+import numpy as np
+
+from Shortcourse import kernels
+
+
+def compare(rows: int, repeat: int = 3) -> list:
+    """Times every statistic on both paths and returns (name, statistics seconds, numpy seconds) rows."""
+    rng = np.random.default_rng(0)
+    x = rng.normal(50, 10, rows)
+    y = 2 * x + rng.normal(0, 5, rows)
+    x_list = x.tolist()
+    y_list = y.tolist()
+    cases = [
+        ("mean", lambda: stats.mean(x_list), lambda: kernels.mean(x)),
+        ("stdev", lambda: stats.stdev(x_list), lambda: kernels.stdev(x)),
+        ("quantiles", lambda: stats.quantiles(x_list), lambda: kernels.quantiles(x)),
+        ("pmcc", lambda: stats.correlation(x_list, y_list), lambda: kernels.correlation(x, y)),
+        ("regression", lambda: stats.linear_regression(x_list, y_list), lambda: kernels.linear_regression(x, y)),
+    ]
+    results = []
+    for name, slow, fast in cases:
+        slow_time = min(timeit.repeat(slow, number=1, repeat=repeat))
+        fast_time = min(timeit.repeat(fast, number=1, repeat=repeat))
+        results.append((name, slow_time, fast_time))
+    return results
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"{rows} rows")
+    print(f"{'statistic':<12}{'statistics / s':>16}{'numpy / s':>12}{'speedup':>10}")
+    for name, slow_time, fast_time in compare(rows):
+        print(f"{name:<12}{slow_time:>16.4f}{fast_time:>12.4f}{slow_time / fast_time:>9.0f}x")
@@ -0,0 +1,272 @@
+"""
+Times the Subdivision, Mixin and plot hot paths on synthetic tables, with wall time and peak memory,
+and checks them against a baseline saved earlier on the same machine. Run from the repository root:
+
+    python -m benchmarks.suite --save                 # record the baseline for this machine
+    python -m benchmarks.suite                        # compare; exits with 1 if anything regressed
+    python -m benchmarks.suite --rows 1e3,1e7 --only clean,hypothesis_test --threshold 0.5
+
+Baselines are JSON files in benchmarks/baselines, named after the machine and python version,
+so results from different machines are never compared.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+import numpy as np
+from pandas import DataFrame
+
+from Shortcourse.core_subdivision import subdivisionFromColumns, subdivisionFromExcel, subsetSubdivision
+from Shortcourse.plots import plot_scatter
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+CONTINENTS = ["Africa", "Asia", "Europe", "North America", "Oceania", "South America"]
+PLACES = 100_000  # Distinct locations, repeated in larger tables
+NOISE_TIME = 0.002  # Seconds. Smaller slowdowns are timer noise, whatever the ratio.
+NOISE_MEMORY = 1 << 16  # Bytes. Smaller increases are allocator noise.
+
+
+def syntheticTable(rows: int, seed: int = 0):
+    """
+    A table shaped like the exam data: location, continent, gdp_per_capita (skewed), life_expectancy
+    (correlated with the log of gdp) and hospital_beds_per_thousand (with 5% NaN).
+    """
+    rng = np.random.default_rng(seed)
+    places = np.array([f"place {i}" for i in range(min(rows, PLACES))], dtype=object)
+    location = places[np.arange(rows) % len(places)]
+    continent = np.array(CONTINENTS, dtype=object)[rng.integers(0, len(CONTINENTS), rows)]
+    gdp = rng.lognormal(9, 1, rows)
+    life = 45 + 3 * np.log(gdp) + rng.normal(0, 4, rows)
+    beds = rng.gamma(2, 1.5, rows)
+    beds[rng.random(rows) < 0.05] = np.nan
+    columns = [location, continent, gdp, life, beds]
+    names = ["location", "continent", "gdp_per_capita", "life_expectancy", "hospital_beds_per_thousand"]
+    return subdivisionFromColumns(columns, names)
+
+
+# Each case takes the table and a scratch directory and returns the function to time. Work done before returning is not timed.
+# Cases that change the table or fill its caches work on a clone, which shares the data but starts with empty caches.
+def _excel(table, workdir):
+    path = os.path.join(workdir, f"table_{table._rowCount()}.xlsx")
+    if not os.path.exists(path):
+        DataFrame({name: table.getColumn(name) for name in table.columnNames}).to_excel(path, index=False)
+    return lambda: subdivisionFromExcel(path, table.columnNames, cache=False)
+
+
+def _columns(table, workdir):
+    clone = table.clone()
+    return lambda: clone.columns
+
+
+def _getColumn(table, workdir):
+    clone = table.clone()
+    return lambda: clone.getColumn("gdp_per_capita")
+
+
+def _clean(table, workdir):
+    clone = table.clone()
+    return lambda: clone.clean(["hospital_beds_per_thousand"])
+
+
+def _filterByEntry(table, workdir):
+    clone = table.clone()
+    return lambda: clone.filterByEntry("continent", "Asia")
+
+
+def _sortEntryValue(table, workdir):
+    clone = table.clone()
+    return lambda: clone.sortEntryValue("gdp_per_capita")
+
+
+def _subsetSubdivision(table, workdir):
+    return lambda: subsetSubdivision(table, ["location", "gdp_per_capita"])
+
+
+def _clone(table, workdir):
+    return table.clone
+
+
+def _removeOutliers(table, workdir):
+    clone = table.clone()
+    return lambda: clone.remove_outliers("gdp_per_capita", "life_expectancy")
+
+
+def _quartileValue(table, workdir):
+    clone = table.clone()
+    return lambda: clone.quartileValue("gdp_per_capita", 2)
+
+
+def _hypothesisTest(table, workdir):
+    clone = table.clone()
+    return lambda: clone.hypothesis_test("gdp_per_capita", "life_expectancy", value_table=False, verbose=False)
+
+
+def _plotScatter(table, workdir):
+    return lambda: plot_scatter(table, "gdp_per_capita", "life_expectancy", headless=True).close()
+
+
+def _saveScatter(table, workdir):
+    scatter = plot_scatter(table, "gdp_per_capita", "life_expectancy", headless=True)
+    path = os.path.join(workdir, "scatter.png")
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            scatter.saveScatter(path)
+    return run
+
+
+CASES = {
+    "subdivisionFromExcel": _excel,
+    "columns": _columns,
+    "getColumn": _getColumn,
+    "clean": _clean,
+    "filterByEntry": _filterByEntry,
+    "sortEntryValue": _sortEntryValue,
+    "subsetSubdivision": _subsetSubdivision,
+    "clone": _clone,
+    "remove_outliers": _removeOutliers,
+    "quartileValue": _quartileValue,
+    "hypothesis_test": _hypothesisTest,
+    "plot_scatter": _plotScatter,
+    "saveScatter": _saveScatter,
+}
+EXCEL_MAX_ROWS = 100_000  # Excel sheets hold about 1M rows, and writing big ones takes minutes
+
+
+def measure(case, table, workdir: str, repeat: int = 3) -> tuple:
+    """
+    Best wall time of repeat runs, in seconds, and the peak memory allocated during one more run, in bytes.
+    Memory is traced in its own run because tracing slows everything down.
+    """
+    times = []
+    for i in range(repeat):
+        run = case(table, workdir)
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    run = case(table, workdir)
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(times), peak
+
+
+def runSuite(rows: list, names: list = None, repeat: int = 3, excelMaxRows: int = EXCEL_MAX_ROWS, log=print) -> dict:
+    """Runs the cases on tables of every size in rows. Returns {"case/rows": {"seconds": ..., "peak_bytes": ...}}."""
+    names = list(CASES) if names == None else names
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in rows:
+            table = syntheticTable(size)
+            for name in names:
+                if name == "subdivisionFromExcel" and size > excelMaxRows:
+                    continue
+                seconds, peak = measure(CASES[name], table, workdir, repeat if size < 1_000_000 else 1)
+                results[f"{name}/{size}"] = {"seconds": seconds, "peak_bytes": peak}
+                log(f"{name:<22}{size:>10}{seconds:>12.4f}{peak / 2**20:>12.1f}")
+    return results
+
+
+def machineTag() -> str:
+    """Names the machine and interpreter the results belong to."""
+    tag = f"{platform.node()}-{platform.machine()}-{platform.python_implementation()}{sys.version_info[0]}.{sys.version_info[1]}"
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", tag)
+
+
+def baselinePath(tag: str = None) -> str:
+    return os.path.join(BASELINE_DIR, f"{tag or machineTag()}.json")
+
+
+def saveBaseline(results: dict, path: str = None) -> str:
+    """Writes the results with the machine's details. Existing entries for other cases and sizes are kept."""
+    path = path or baselinePath()
+    baseline = loadBaseline(path) or {"results": {}}
+    baseline["results"].update(results)
+    baseline["machine"] = {
+        "tag": machineTag(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "matplotlib": matplotlib.__version__,
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+    return path
+
+
+def loadBaseline(path: str = None) -> dict:
+    try:
+        with open(path or baselinePath(), "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def regressions(results: dict, baseline: dict, threshold: float = 0.25) -> list:
+    """
+    (key, measure, baseline value, new value) for every result that is more than threshold (a fraction)
+    slower or bigger than the baseline. Differences under the noise floors are ignored.
+    """
+    found = []
+    for key, result in results.items():
+        old = baseline["results"].get(key)
+        if old == None:
+            continue
+        if result["seconds"] > old["seconds"] * (1 + threshold) and result["seconds"] - old["seconds"] > NOISE_TIME:
+            found.append((key, "seconds", old["seconds"], result["seconds"]))
+        if result["peak_bytes"] > old["peak_bytes"] * (1 + threshold) and result["peak_bytes"] - old["peak_bytes"] > NOISE_MEMORY:
+            found.append((key, "peak_bytes", old["peak_bytes"], result["peak_bytes"]))
+    return found
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description="Benchmark the Shortcourse hot paths.")
+    parser.add_argument("--rows", default="1e3,1e4,1e5,1e6", help="comma separated table sizes (default: 1e3,1e4,1e5,1e6)")
+    parser.add_argument("--only", default=None, help=f"comma separated cases, from: {', '.join(CASES)}")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case, the best is kept (1 from 1e6 rows)")
+    parser.add_argument("--excel-max", type=int, default=EXCEL_MAX_ROWS, help="largest table written to and read from Excel")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown or memory growth, as a fraction")
+    parser.add_argument("--save", action="store_true", help="save the results as this machine's baseline")
+    parser.add_argument("--baseline", default=None, help="baseline file (default: the one for this machine)")
+    arguments = parser.parse_args(argv)
+
+    rows = [int(float(size)) for size in arguments.rows.split(",")]
+    names = None if arguments.only == None else arguments.only.split(",")
+    for name in names or []:
+        if name not in CASES:
+            parser.error(f"unknown case {name}")
+
+    matplotlib.use("Agg")
+    print(f"{'case':<22}{'rows':>10}{'seconds':>12}{'peak MB':>12}")
+    results = runSuite(rows, names, arguments.repeat, arguments.excel_max)
+
+    if arguments.save:
+        print(f"Baseline saved to: {saveBaseline(results, arguments.baseline)}")
+        return 0
+    baseline = loadBaseline(arguments.baseline)
+    if baseline == None:
+        print("No baseline for this machine. Run with --save to record one.")
+        return 0
+    found = regressions(results, baseline, arguments.threshold)
+    for key, kind, old, new in found:
+        print(f"REGRESSION {key} {kind}: {old:.4g} -> {new:.4g} ({new / old:.2f}x)")
+    if len(found) == 0:
+        print(f"No regressions beyond {arguments.threshold:.0%} of the baseline.")
+    return 1 if len(found) > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())